@@ -0,0 +1,77 @@
+# benchmarks/bench_dedup.py
+#
+# Feeds synthetic books (running headers, page footers, a lightly edited second edition) through
+# the sentence deduplicator and reports throughput, how much was dropped and how many distinct
+# sentences were lost by mistake.
+# Usage: python benchmarks/bench_dedup.py [--sentences 50000] [--pages 500]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.dedup import SentenceDeduplicator
+
+def random_sentence(rng, vocabulary):
+    return ' '.join(rng.choices(vocabulary, k=rng.randint(8, 30))).capitalize() + '.'
+
+def book(body, pages):
+    per_page = max(1, len(body) // pages)
+    for page in range(pages):
+        yield "The Complete Guide To Everything."
+        yield "Copyright 2021 Example Press. All rights reserved."
+        yield from body[page * per_page:(page + 1) * per_page]
+        yield f"Page {page + 1} of {pages}"
+
+def second_edition(body, rng):
+    for sentence in body:
+        # One sentence in ten gets a small edit, the rest is reprinted as is
+        if rng.random() < 0.1:
+            words = sentence.rstrip('.').split()
+            words[rng.randrange(len(words))] = 'revised'
+            sentence = ' '.join(words) + '.'
+        yield sentence
+
+def run(name, deduplicator, documents):
+    started = time.perf_counter()
+    seen = 0
+    for sentences in documents:
+        document = deduplicator.document()
+        for sentence in sentences:
+            document.accept(sentence)
+            seen += 1
+        document.commit()
+    elapsed = time.perf_counter() - started
+    stats = deduplicator.stats()
+    print(f"{name}: {seen} sentences in {elapsed:.2f}s ({seen / elapsed:,.0f} sentences/s)")
+    print(f"  kept {stats['kept']}, dropped {stats['dropped']} ({stats['dropped_ratio']:.1%}): "
+          f"exact {stats['exact_document']}+{stats['exact_corpus']}, near {stats['near_document']}+{stats['near_corpus']} "
+          f"(document+corpus)")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sentences', type=int, default=50000)
+    parser.add_argument('--pages', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9))) for _ in range(20000)]
+    body = [random_sentence(rng, vocabulary) for _ in range(args.sentences)]
+    documents = lambda: [list(book(body, args.pages)), list(book(list(second_edition(body, random.Random(1))), args.pages))]
+    unique = len(set(body))
+    print(f"{unique} distinct body sentences, {2 * (args.sentences + 3 * args.pages)} raw sentences over two editions")
+    run("exact only", SentenceDeduplicator(near_duplicates=False), documents())
+    stats = run("exact + MinHash/LSH", SentenceDeduplicator(), documents())
+
+    # Distinct sentences dropped as near duplicates of each other are false positives
+    distinct = SentenceDeduplicator().document()
+    lost = sum(1 for sentence in set(body) if not distinct.accept(sentence))
+    print(f"  false drops among {unique} distinct sentences: {lost}")
+    print(f"  corpus index holds {stats['corpus_size']} sentences")
+
+if __name__ == '__main__':
+    main()
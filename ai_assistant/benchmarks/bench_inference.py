@@ -0,0 +1,70 @@
+# benchmarks/bench_inference.py
+#
+# Latency/throughput of InferenceEngine at several concurrency levels, comparing
+# one-at-a-time generation (batch size 1) with micro-batching, optionally int8-quantized.
+# Usage: python benchmarks/bench_inference.py [--requests 64] [--concurrency 1 4 16] [--quantize] [--threads 4]
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import model_registry
+from modules.inference import InferenceEngine
+
+PROMPTS = [
+    "Tell me about Trading.",
+    "What do you think about Machine Learning?",
+    "How can I improve accuracy of machine learning model?",
+    "What is the best way to learn Python?",
+]
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run(engine, requests, concurrency):
+    def one(i):
+        started = time.perf_counter()
+        engine.generate(PROMPTS[i % len(PROMPTS)])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    return latencies, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='bert-base-uncased')
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--quantize', action='store_true')
+    args = parser.parse_args()
+
+    tokenizer = model_registry.get_tokenizer(args.model)
+    model = model_registry.get_model(args.model)
+    variants = [('unbatched', 1, False), ('batched', args.max_batch_size, False)]
+    if args.quantize:
+        variants.append(('batched+int8', args.max_batch_size, True))
+
+    for name, batch_size, quantize in variants:
+        engine = InferenceEngine(lambda: model, lambda: tokenizer, max_batch_size=batch_size,
+                                 max_wait_ms=args.max_wait_ms, num_threads=args.threads, quantize=quantize).start()
+        engine.generate(PROMPTS[0])  # warm-up, and builds the quantized copy
+        for concurrency in args.concurrency:
+            latencies, elapsed = run(engine, args.requests, concurrency)
+            print(f"{name:<13} c={concurrency:<3} {args.requests / elapsed:7.2f} req/s   "
+                  f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   p99 {percentile(latencies, 0.99) * 1000:8.1f} ms   "
+                  f"mean batch {engine.metrics()['mean_batch_size']:.1f}   "
+                  f"per generate {engine.metrics()['mean_generate_size']:.1f}")
+        engine.stop()
+
+if __name__ == '__main__':
+    main()
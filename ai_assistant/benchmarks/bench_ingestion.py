@@ -0,0 +1,68 @@
+# benchmarks/bench_ingestion.py
+#
+# Generates text-layer PDFs and runs them through ingest_documents on SQLite with several parse
+# workers, then checks that every document and sentence reached the table and the manifest.
+# Exits non-zero if any document failed. Needs PyMuPDF and the nltk punkt_tab data.
+# Usage: python benchmarks/bench_ingestion.py [--documents 4] [--pages 60] [--workers 2 4]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from sqlalchemy import func, select
+from modules import database, setup_database
+from modules.database import BookKnowledge, IngestionManifest, new_session
+
+def write_documents(folder, documents, pages, rng):
+    os.makedirs(folder)
+    for number in range(documents):
+        document = fitz.open()
+        for _ in range(pages):
+            page = document.new_page()
+            text = ' '.join(f"Sentence {rng.randint(0, 10 ** 9)} of document {number} covers topic "
+                            f"{rng.randint(0, 10 ** 6)} in some detail." for _ in range(40))
+            page.insert_textbox(fitz.Rect(36, 36, 560, 800), text, fontsize=7)
+        document.save(os.path.join(folder, f"book{number}.pdf"))
+
+def run(directory, documents, pages, workers, seed):
+    database.configure(f"sqlite:///{os.path.join(directory, f'ingest_{workers}.db')}")
+    folder = os.path.join(directory, f"books_{workers}")
+    write_documents(folder, documents, pages, random.Random(seed))
+    started = time.perf_counter()
+    rows = setup_database.ingest_documents(setup_database.collect_documents(folder, 'book'), max_workers=workers)
+    elapsed = time.perf_counter() - started
+    session = new_session()
+    try:
+        stored = session.execute(select(func.count()).select_from(BookKnowledge)).scalar()
+        titles = session.execute(select(func.count(func.distinct(BookKnowledge.document_title)))).scalar()
+        manifest = session.query(IngestionManifest).filter_by(kind='document').count()
+    finally:
+        session.close()
+        database.dispose()
+    left = [name for name in os.listdir(folder) if name.endswith('.pdf')]
+    ok = rows == stored and titles == manifest == documents and not left
+    print(f"{workers} workers: {titles}/{documents} documents, {stored} sentences in {elapsed:.2f}s "
+          f"({stored / elapsed:,.0f} rows/s), {manifest} manifest entries, {len(left)} left unprocessed"
+          f"{'' if ok else '  FAILED'}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--documents', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=60)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = [run(directory, args.documents, args.pages, workers, args.seed) for workers in args.workers]
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# benchmarks/bench_pipeline.py
+#
+# End-to-end benchmark of the assistant pipeline with every external service replaced by a local stub:
+# LocalTranslator, StubServer (weather/news), SQLite (knowledge base, sentence search, ingestion),
+# LocalRecognizer and LocalSynthesizer. Reports throughput and p50/p95/p99 per stage from modules.metrics.
+# Generation uses an echo stand-in unless --with-model is given (needs torch and the BERT weights).
+# Usage: python benchmarks/bench_pipeline.py [--turns 200] [--seed 0] [--json out.json] [--prometheus out.prom]
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from modules import database, metrics
+from modules.database import Knowledge, BookKnowledge, get_engine, ensure_search_index
+from modules.nlp import NLPManager
+from modules.stt_tts import SpeechManager
+from modules.audio_cache import AudioCache
+from stub_services import (StubServer, LocalTranslator, LocalRecognizer, LocalSynthesizer, weather_payload,
+                           news_payload, point_manager_at_stubs)
+
+MODULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modules')
+KNOWLEDGE_BASE = os.path.join(MODULES_DIR, 'knowledge_base.json')
+
+class EchoGenerator:
+    # Stand-in for InferenceEngine when the model is not loaded
+    def __init__(self, latency=0.02):
+        self.latency = latency
+
+    def generate(self, text, timeout=None):
+        time.sleep(self.latency)
+        return f"You said: {text}"
+
+    async def generate_async(self, text):
+        await asyncio.sleep(self.latency)
+        return f"You said: {text}"
+
+    def metrics(self):
+        return {'stand_in': True}
+
+def build_turns(knowledge_base, count, rng):
+    questions = list(knowledge_base)
+    kinds = [
+        (0.35, lambda: (rng.choice(questions), 'en')),
+        (0.15, lambda: (f"Can you tell me {rng.choice(questions).rstrip('?').lower()}?", 'en')),
+        (0.15, lambda: (f"What is the weather in {rng.choice(['Warsaw', 'Krakow', 'Gdansk', 'Berlin'])}?", 'pl')),
+        (0.10, lambda: (f"What is the news about {rng.choice(['Python', 'Elon Musk', 'space'])}?", 'en')),
+        (0.10, lambda: (f"What is {rng.choice(['gradient descent', 'risk management', 'photosynthesis'])}?", 'en')),
+        (0.15, lambda: (None, 'en')),
+    ]
+    turns = []
+    for _ in range(count):
+        roll, total = rng.random(), 0.0
+        for weight, make in kinds:
+            total += weight
+            if roll <= total:
+                turns.append(make())
+                break
+        else:
+            turns.append(kinds[-1][1]())
+    return turns
+
+def seed_database(knowledge_base, sentences, rng):
+    engine = get_engine()
+    ensure_search_index(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Knowledge), [{'question': q, 'answer': a} for q, a in knowledge_base.items()])
+        vocabulary = ['gradient', 'descent', 'risk', 'management', 'photosynthesis', 'model', 'market', 'energy',
+                      'learning', 'trading', 'light', 'plant', 'loss', 'portfolio', 'update', 'step']
+        rows = [{'document_title': f"doc{i // 500}.pdf", 'author': 'Unknown', 'source': 'book',
+                 'sentence': ' '.join(rng.choices(vocabulary, k=rng.randint(6, 18))).capitalize() + '.'}
+                for i in range(sentences)]
+        connection.execute(insert(BookKnowledge), rows)
+
+def run_ingestion(directory, documents, rng):
+    import fitz
+    import nltk
+    from modules import setup_database
+    with metrics.stage('bench_ingest_json'):
+        setup_database.load_knowledge_base(KNOWLEDGE_BASE)
+    folder = os.path.join(directory, 'books')
+    os.makedirs(folder)
+    for number in range(documents):
+        document = fitz.open()
+        for _ in range(5):
+            page = document.new_page()
+            text = ' '.join(f"Sentence {rng.randint(0, 10 ** 6)} of document {number} discusses topic {rng.randint(0, 50)}."
+                            for _ in range(30))
+            page.insert_textbox(fitz.Rect(36, 36, 560, 800), text, fontsize=8)
+        document.save(os.path.join(folder, f"book{number}.pdf"))
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+    except LookupError:
+        print("Skipping document ingestion: nltk punkt_tab data is not installed")
+        return
+    setup_database.ingest_documents(setup_database.collect_documents(folder, 'book'), max_workers=2)
+
+async def voice_turn(nlp_manager, speech_manager, question, language, audio):
+    # STT -> question answering -> TTS, with the answer starting as soon as the final transcript arrives
+    with metrics.stage('voice_turn'):
+        if question is None:
+            transcript = ' '.join(await nlp_manager.run_blocking(lambda: list(speech_manager.final_transcripts(audio))))
+            answer = await nlp_manager.have_conversation_async(transcript, language)
+        else:
+            answer = await nlp_manager.answer_question_async(question, language)
+        return await nlp_manager.run_blocking(lambda: speech_manager.text_to_speech(answer, language, return_bytes=True))
+
+async def run_turns(nlp_manager, speech_manager, turns, concurrency, audio_bytes):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question, language):
+        async with semaphore:
+            await voice_turn(nlp_manager, speech_manager, question, language, [b'\0' * audio_bytes])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(question, language) for question, language in turns))
+    elapsed = time.perf_counter() - started
+    await nlp_manager.aclose()
+    return elapsed
+
+def print_report(title, elapsed=None, turns=None):
+    print(title)
+    if elapsed is not None:
+        print(f"  {turns} turns in {elapsed:.2f}s ({turns / elapsed:.1f} turns/s)")
+    print(f"  {'stage':<22} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for stage, summary in sorted(metrics.stage_summary().items()):
+        print(f"  {stage:<22} {summary['count']:>7} {summary['p50'] * 1000:>9.2f} {summary['p95'] * 1000:>9.2f} "
+              f"{summary['p99'] * 1000:>9.2f} {summary['mean'] * 1000:>9.2f}")
+    counters = metrics.REGISTRY.snapshot()['counters']
+    for name in sorted(counters):
+        print(f"  {name} = {counters[name]}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sentences', type=int, default=20000)
+    parser.add_argument('--documents', type=int, default=4)
+    parser.add_argument('--api-latency', type=float, default=0.05)
+    parser.add_argument('--translation-latency', type=float, default=0.01)
+    parser.add_argument('--tts-latency', type=float, default=0.05)
+    parser.add_argument('--stt-chunk-latency', type=float, default=0.002)
+    parser.add_argument('--audio-seconds', type=float, default=2.0)
+    parser.add_argument('--with-model', action='store_true')
+    parser.add_argument('--json')
+    parser.add_argument('--prometheus')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(KNOWLEDGE_BASE) as file:
+        knowledge_base = json.load(file)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database.configure(f"sqlite:///{os.path.join(directory, 'knowledge.db')}")
+        seed_database(knowledge_base, args.sentences, rng)
+
+        metrics.REGISTRY.reset()
+        run_ingestion(directory, args.documents, rng)
+        print_report("Ingestion")
+
+        metrics.REGISTRY.reset()
+        with StubServer(weather_payload, args.api_latency) as weather, StubServer(news_payload, args.api_latency) as news:
+            nlp_manager = NLPManager(translator=LocalTranslator(latency=args.translation_latency))
+            point_manager_at_stubs(nlp_manager, weather, news)
+            nlp_manager.training_enabled = args.with_model
+            nlp_manager.load_semantic_index(os.path.join(directory, 'no_sentence_index'))
+            if not args.with_model:
+                nlp_manager._inference_engine = EchoGenerator()
+            speech_manager = SpeechManager(
+                recognizer=LocalRecognizer("tell me about gradient descent and risk management in trading",
+                                           latency=args.stt_chunk_latency),
+                synthesizer=LocalSynthesizer(latency=args.tts_latency),
+                audio_cache=AudioCache(directory=os.path.join(directory, 'tts')),
+            )
+            with metrics.stage('bench_knowledge_load'):
+                nlp_manager.load_knowledge_base()
+            turns = build_turns(knowledge_base, args.turns, rng)
+            audio_bytes = int(args.audio_seconds * 16000 * 2)
+            elapsed = asyncio.run(run_turns(nlp_manager, speech_manager, turns, args.concurrency, audio_bytes))
+        print_report(f"Voice turns (concurrency {args.concurrency}, seed {args.seed})", elapsed, len(turns))
+
+        if args.json:
+            with open(args.json, 'w') as out:
+                snapshot = nlp_manager.metrics_snapshot()
+                snapshot['tts_cache'] = speech_manager.audio_cache.stats()
+                json.dump(snapshot, out, indent=2, sort_keys=True)
+        if args.prometheus:
+            with open(args.prometheus, 'w') as out:
+                out.write(metrics.REGISTRY.to_prometheus())
+        database.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+# benchmarks/bench_question_index.py
+#
+# Compares exact dict lookup with QuestionIndex on reworded knowledge base questions, and counts wrong
+# answers on three negative sets: each knowledge base question held out of the index (leave-one-out),
+# knowledge base subjects asked about in ways the stored answer does not cover, and off-topic questions.
+# --sweep prints hit and false-answer rates per threshold, which is how QuestionIndex.threshold is chosen.
+# Usage: python benchmarks/bench_question_index.py [--scale 50000] [--sweep]
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.question_index import QuestionIndex
+
+KNOWLEDGE_BASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modules', 'knowledge_base.json')
+
+def variants(question):
+    stripped = question.rstrip('?')
+    yield question
+    yield question.lower()
+    yield stripped
+    yield stripped.upper() + " ?"
+    yield "  ".join(stripped.split())
+    yield f"Can you tell me {stripped[0].lower()}{stripped[1:]}?"
+    yield stripped.replace("What is", "what's").replace("Who is", "who's")
+
+def paraphrases(question):
+    # Rewordings that add or drop words but still ask the stored question
+    stripped = question.rstrip('?')
+    lowered = f"{stripped[0].lower()}{stripped[1:]}"
+    yield ' '.join(word for word in stripped.split() if word.lower() not in ('the', 'a', 'an')) + '?'
+    yield f"Hey, {lowered}?"
+    yield f"{stripped}, please?"
+    yield f"Do you know {lowered}?"
+    yield f"I would like to know {lowered}"
+    yield f"{stripped} exactly?"
+
+UNKNOWN_QUESTIONS = [
+    "What is Java?",
+    "What is the capital of Atlantis?",
+    "How do I bake bread?",
+    "Who wrote Hamlet?",
+    "What is the weather like?",
+    "Why is the sky green on Mars?",
+    "What time is it?",
+    "How are you today?",
+    "What is your name?",
+    "Tell me a joke",
+    "What should I cook for dinner?",
+    "How do I reset my password?",
+    "Who won the game last night?",
+    "What is the meaning of life?",
+    "How far is the nearest gas station?",
+    "Can you set an alarm for seven?",
+    "What is the best programming language?",
+    "Who is the richest person in the world?",
+    "How do I learn to play guitar?",
+    "What is the price of bitcoin?",
+    "Where did I leave my keys?",
+    "What movies are playing tonight?",
+    "How many calories are in an apple?",
+    "Who is your favourite author?",
+    "What is the capital of the moon?",
+    "Why do cats purr?",
+    "How do airplanes fly?",
+    "What is the tallest building in Atlantis?",
+    "Who painted my house?",
+    "What is the speed of a snail?",
+]
+
+# Questions about a stored question's subject that its stored answer does not answer
+REWORDINGS = [
+    "Who invented {}?",
+    "What is the history of {}?",
+    "What is not {}?",
+    "Who is the president of {}?",
+    "Why is {} important?",
+    "When was {} discovered?",
+]
+
+def subject(question):
+    # "What is the capital of Egypt?" -> "the capital of Egypt"
+    words = question.rstrip('?').split()
+    return ' '.join(words[2:]) if len(words) > 2 else None
+
+def reworded_questions(knowledge_base):
+    from modules.question_index import normalize_question
+    stored = {normalize_question(question) for question in knowledge_base}
+    negatives = []
+    for question in knowledge_base:
+        topic = subject(question)
+        if topic:
+            negatives.extend((template.format(topic), question) for template in REWORDINGS
+                             if normalize_question(template.format(topic)) not in stored)
+    return negatives
+
+def leave_one_out(knowledge_base):
+    # A held-out question may still match one with the same answer ("Who wrote X" / "Who is the author of X");
+    # any other match is a wrong answer. Returns (held-out question, score, whether the match is wrong)
+    questions = list(knowledge_base)
+    results = []
+    for position, question in enumerate(questions):
+        index = QuestionIndex(questions[:position] + questions[position + 1:])
+        hits = index.search(question, k=1)
+        if hits:
+            match, score = hits[0]
+            results.append((question, score, knowledge_base[match] != knowledge_base[question]))
+        else:
+            results.append((question, 0.0, False))
+    return results
+
+def synthetic_questions(count, seed=0):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(count // 4 + 100)]
+    starts = ["What is", "Who is", "Where is", "How does", "Why is", "When was"]
+    return [f"{rng.choice(starts)} {' '.join(rng.sample(words, rng.randint(2, 6)))}?" for _ in range(count)]
+
+def measure(lookup, queries):
+    started = time.perf_counter()
+    hits = sum(1 for query, expected in queries if lookup(query) == expected)
+    elapsed = time.perf_counter() - started
+    return hits / len(queries), elapsed / len(queries) * 1e6
+
+def report(name, knowledge_base, queries, reworded_positives=()):
+    started = time.perf_counter()
+    index = QuestionIndex(knowledge_base)
+    build_ms = (time.perf_counter() - started) * 1000
+    exact_rate, exact_us = measure(lambda q: q if q in knowledge_base else None, queries)
+    index_rate, index_us = measure(index.best_match, queries)
+    print(f"{name}: {len(knowledge_base)} questions, {len(queries)} queries, index built in {build_ms:.1f} ms")
+    print(f"  exact lookup   hit rate {exact_rate:6.1%}  mean latency {exact_us:8.2f} us")
+    print(f"  QuestionIndex  hit rate {index_rate:6.1%}  mean latency {index_us:8.2f} us")
+    if reworded_positives:
+        paraphrase_rate, _ = measure(index.best_match, reworded_positives)
+        print(f"  QuestionIndex  hit rate {paraphrase_rate:6.1%}  on {len(reworded_positives)} paraphrases")
+        held_out = leave_one_out(knowledge_base)
+        wrong = [question for question, score, is_wrong in held_out if is_wrong and score >= index.threshold]
+        print(f"  wrong answers, held-out questions:  {len(wrong)}/{len(held_out)}")
+        reworded = reworded_questions(knowledge_base)
+        wrong = [query for query, _ in reworded if index.best_match(query) is not None]
+        print(f"  wrong answers, reworded questions:  {len(wrong)}/{len(reworded)}  e.g. {wrong[:3]}")
+        wrong = [query for query in UNKNOWN_QUESTIONS if index.best_match(query) is not None]
+        print(f"  wrong answers, off-topic questions: {len(wrong)}/{len(UNKNOWN_QUESTIONS)}  e.g. {wrong[:3]}")
+
+def top_score(index, query, expected=None):
+    hits = index.search(query, k=1)
+    if not hits or expected is not None and hits[0][0] != expected:
+        return 0.0
+    return hits[0][1]
+
+def sweep(knowledge_base, queries):
+    index = QuestionIndex(knowledge_base)
+    positive = [top_score(index, query, expected) for query, expected in queries]
+    held_out = [score for _, score, is_wrong in leave_one_out(knowledge_base) if is_wrong]
+    reworded = [top_score(index, query) for query, _ in reworded_questions(knowledge_base)]
+    off_topic = [top_score(index, query) for query in UNKNOWN_QUESTIONS]
+    print(f"threshold sweep: {len(queries)} paraphrases; wrong answers on {len(held_out)} held-out, "
+          f"{len(reworded)} reworded and {len(off_topic)} off-topic questions")
+    for step in range(50, 96, 5):
+        threshold = step / 100
+        rates = [sum(score >= threshold for score in scores) / len(scores)
+                 for scores in (positive, held_out, reworded, off_topic)]
+        print(f"  {threshold:.2f}  paraphrase hits {rates[0]:6.1%}  wrong: held-out {rates[1]:6.1%}  "
+              f"reworded {rates[2]:6.1%}  off-topic {rates[3]:6.1%}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=50000)
+    parser.add_argument('--sweep', action='store_true')
+    args = parser.parse_args()
+
+    with open(KNOWLEDGE_BASE, 'r') as file:
+        knowledge_base = json.load(file)
+    queries = [(variant, question) for question in knowledge_base for variant in variants(question)]
+    reworded_positives = [(paraphrase, question) for question in knowledge_base for paraphrase in paraphrases(question)]
+    if args.sweep:
+        sweep(knowledge_base, reworded_positives)
+        return
+    report("knowledge_base.json", knowledge_base, queries, reworded_positives)
+
+    synthetic = synthetic_questions(args.scale)
+    knowledge_base = {question: question for question in synthetic}
+    rng = random.Random(1)
+    queries = [(variant, question) for question in rng.sample(synthetic, 2000) for variant in variants(question)]
+    report("synthetic", knowledge_base, queries)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_sentence_search.py
+#
+# Measures search_sentences latency on SQLite FTS5 as the sentence corpus grows, next to a
+# LIKE scan over the same rows.
+# Usage: python benchmarks/bench_sentence_search.py [--sizes 10000 100000 500000] [--queries 200]
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text
+from modules import database
+from modules.database import BookKnowledge, ResearchPaperKnowledge, get_engine, ensure_search_index, search_sentences
+
+def synthetic_rows(count, start, rng, vocabulary):
+    for i in range(start, start + count):
+        yield {
+            'document_title': f"doc{i // 500}.pdf",
+            'author': 'Unknown',
+            'sentence': ' '.join(rng.choices(vocabulary, k=rng.randint(8, 25))) + '.',
+            'source': 'benchmark',
+        }
+
+def grow(engine, table, count, start, rng, vocabulary, batch_size=10000):
+    with engine.begin() as connection:
+        rows = list(synthetic_rows(count, start, rng, vocabulary))
+        for offset in range(0, len(rows), batch_size):
+            connection.execute(insert(table), rows[offset:offset + batch_size])
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def time_queries(run, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        run(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), percentile(samples, 0.95)
+
+def like_scan(engine, query):
+    term = query.split()[0]
+    with engine.connect() as connection:
+        return connection.execute(text(
+            "SELECT id, document_title, sentence FROM book_knowledge WHERE sentence LIKE :pattern LIMIT 10"),
+            {'pattern': f"%{term}%"}).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(20000)]
+    queries = [' '.join(rng.choices(vocabulary, k=rng.randint(1, 3))) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        database.configure(f"sqlite:///{os.path.join(directory, 'search.db')}")
+        engine = get_engine()
+        ensure_search_index(engine)
+        grow(engine, ResearchPaperKnowledge, 1000, 0, rng, vocabulary)
+        rows = 0
+        for size in sorted(args.sizes):
+            added = size - rows
+            started = time.perf_counter()
+            grow(engine, BookKnowledge, added, rows, rng, vocabulary)
+            insert_s = time.perf_counter() - started
+            rows = size
+            any_p50, any_p95 = time_queries(lambda q: search_sentences(q, k=10), queries)
+            all_p50, all_p95 = time_queries(lambda q: search_sentences(q, k=10, match='all'), queries)
+            page_p50, page_p95 = time_queries(lambda q: search_sentences(q, k=10, offset=20, source='book'), queries)
+            title_p50, title_p95 = time_queries(lambda q: search_sentences(q, k=10, document_title='doc3.pdf'), queries)
+            like_p50, like_p95 = time_queries(lambda q: like_scan(engine, q), queries[:20])
+            print(f"{size} sentences (indexed insert {added / max(insert_s, 1e-9):,.0f} rows/s for the last batch)")
+            print(f"  fts any-term     p50 {any_p50:8.2f} ms  p95 {any_p95:8.2f} ms")
+            print(f"  fts all-terms    p50 {all_p50:8.2f} ms  p95 {all_p95:8.2f} ms")
+            print(f"  fts page 3       p50 {page_p50:8.2f} ms  p95 {page_p95:8.2f} ms")
+            print(f"  fts by document  p50 {title_p50:8.2f} ms  p95 {title_p95:8.2f} ms")
+            print(f"  LIKE scan        p50 {like_p50:8.2f} ms  p95 {like_p95:8.2f} ms")
+        database.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_startup.py
+#
+# Cold start: a fresh interpreter imports modules.nlp and constructs NLPManager.
+# Warm start: further managers in the same process, sharing the model registry.
+# Usage: python benchmarks/bench_startup.py [--runs 5] [--with-models]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+def child(with_models):
+    timings = {}
+    started = time.perf_counter()
+    from modules.nlp import NLPManager
+    timings['import_ms'] = (time.perf_counter() - started) * 1000
+    holder = {}
+    timings['construct_ms'] = timed(lambda: holder.setdefault('manager', NLPManager()))
+    if with_models:
+        manager = holder['manager']
+        timings['tokenizer_ms'] = timed(lambda: manager.tokenizer)
+        timings['model_ms'] = timed(lambda: manager.model)
+        second = NLPManager()
+        timings['warm_construct_ms'] = timed(NLPManager)
+        timings['warm_model_ms'] = timed(lambda: (second.tokenizer, second.model))
+    print(json.dumps(timings))
+
+def summarize(runs):
+    keys = runs[0].keys()
+    for key in keys:
+        values = [run[key] for run in runs]
+        print(f"  {key:<20} median {statistics.median(values):10.2f} ms   min {min(values):10.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--with-models', action='store_true')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.with_models)
+        return
+
+    command = [sys.executable, os.path.abspath(__file__), '--child'] + (['--with-models'] if args.with_models else [])
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    print(f"NLPManager startup over {args.runs} fresh processes:")
+    summarize(runs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_training_batches.py
+#
+# CPU training throughput of the original pad-to-512 data path against the
+# pre-tokenized, length-bucketed, dynamically padded one. Each pipeline runs in
+# its own process so peak RSS is comparable.
+# Usage: python benchmarks/bench_training_batches.py [--model tiny|bert-base-uncased] [--steps 20]
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+KNOWLEDGE_BASE = os.path.join(ROOT, 'modules', 'knowledge_base.json')
+
+def load_interactions():
+    with open(KNOWLEDGE_BASE, 'r') as file:
+        return [{'question': question, 'answer': answer} for question, answer in json.load(file).items()]
+
+def load_model(name):
+    from transformers import BertConfig, BertForMaskedLM
+    if name == 'tiny':
+        config = BertConfig(hidden_size=128, num_hidden_layers=2, num_attention_heads=2, intermediate_size=512)
+        return BertForMaskedLM(config)
+    return BertForMaskedLM.from_pretrained(name)
+
+def legacy_loader(tokenizer, interactions, batch_size):
+    import torch
+    from torch.utils.data import DataLoader
+
+    def encode(item):
+        encoding = tokenizer(item['question'], max_length=512, padding='max_length', truncation=True,
+                             return_token_type_ids=False, return_tensors='pt')
+        labels = tokenizer(item['answer'], max_length=512, padding='max_length', truncation=True,
+                           return_tensors='pt')['input_ids']
+        labels[labels == tokenizer.pad_token_id] = -100
+        return {'input_ids': encoding['input_ids'].flatten(),
+                'attention_mask': encoding['attention_mask'].flatten(),
+                'labels': labels.flatten()}
+
+    class LegacyDataset(torch.utils.data.Dataset):
+        def __len__(self):
+            return len(interactions)
+
+        def __getitem__(self, index):
+            return encode(interactions[index])
+
+    return DataLoader(LegacyDataset(), batch_size=batch_size)
+
+def bucketed_loader(tokenizer, interactions, batch_size):
+    from modules.training import TokenCache, InteractionDataset, DynamicPaddingCollator, make_dataloader
+    dataset = InteractionDataset(interactions, TokenCache(tokenizer))
+    return make_dataloader(dataset, DynamicPaddingCollator(tokenizer.pad_token_id), batch_size)
+
+def child(args):
+    import torch
+    from transformers import BertTokenizer
+    torch.manual_seed(0)
+    tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
+    model = load_model(args.model)
+    model.train()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-5)
+    interactions = load_interactions()
+    make_loader = legacy_loader if args.pipeline == 'legacy' else bucketed_loader
+    real_tokens = padded_tokens = steps = 0
+    started = time.perf_counter()
+    while steps < args.steps:
+        for batch in make_loader(tokenizer, interactions, args.batch_size):
+            loss = model(**batch).loss
+            loss.backward()
+            optimizer.step()
+            optimizer.zero_grad()
+            real_tokens += int(batch['attention_mask'].sum())
+            padded_tokens += batch['input_ids'].numel()
+            steps += 1
+            if steps >= args.steps:
+                break
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'pipeline': args.pipeline,
+        'steps': steps,
+        'seconds': elapsed,
+        'tokens_per_sec': real_tokens / elapsed,
+        'padding_ratio': 1 - real_tokens / padded_tokens,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='tiny')
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--pipeline', choices=['legacy', 'bucketed'])
+    args = parser.parse_args()
+    if args.pipeline:
+        child(args)
+        return
+
+    print(f"model={args.model} steps={args.steps} batch_size={args.batch_size}")
+    for pipeline in ('legacy', 'bucketed'):
+        command = [sys.executable, os.path.abspath(__file__), '--pipeline', pipeline, '--model', args.model,
+                   '--steps', str(args.steps), '--batch-size', str(args.batch_size)]
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"  {pipeline:<9} {result['tokens_per_sec']:10.1f} tokens/s   {result['seconds']:7.2f} s   "
+              f"padding {result['padding_ratio']:6.1%}   peak RSS {result['peak_rss_mb']:8.1f} MB")
+
+if __name__ == '__main__':
+    main()
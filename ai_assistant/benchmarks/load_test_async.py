@@ -0,0 +1,91 @@
+# benchmarks/load_test_async.py
+#
+# Load test for the async NLPManager API against local weather/news stubs.
+# Usage: python benchmarks/load_test_async.py [--requests 200] [--concurrency 1 10 50] [--latency 0.05]
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.nlp import NLPManager
+from stub_services import StubServer, LocalTranslator, weather_payload, news_payload, point_manager_at_stubs
+
+QUESTIONS = [
+    ("What is the weather in Warsaw district {}?", 'en'),
+    ("What is the weather in Krakow district {}?", 'en'),
+    ("What is the news about Elon Musk {}?", 'en'),
+    ("What is the news about Python release {}?", 'pl'),
+]
+
+def question(run, i):
+    # Every request asks about a different place or topic, so each one reaches the stub API
+    # instead of the weather/news response caches
+    template, language = QUESTIONS[i % len(QUESTIONS)]
+    return template.format(f"{run}-{i}"), language
+
+def clear_caches(nlp_manager):
+    nlp_manager.weather_cache.clear()
+    nlp_manager.news_cache.clear()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def report(name, latencies, elapsed):
+    print(f"  {name:<18} {len(latencies) / elapsed:8.1f} req/s   "
+          f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms   p99 {percentile(latencies, 0.99) * 1000:7.1f} ms")
+
+def run_sync(nlp_manager, total):
+    clear_caches(nlp_manager)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(total):
+        text, language = question('sync', i)
+        request_started = time.perf_counter()
+        nlp_manager.answer_question(text, language)
+        latencies.append(time.perf_counter() - request_started)
+    return latencies, time.perf_counter() - started
+
+async def run_async(nlp_manager, total, concurrency):
+    clear_caches(nlp_manager)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        text, language = question(f"c{concurrency}", i)
+        async with semaphore:
+            request_started = time.perf_counter()
+            await nlp_manager.answer_question_async(text, language)
+            latencies.append(time.perf_counter() - request_started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    await nlp_manager.aclose()
+    return latencies, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubServer(weather_payload, args.latency) as weather, StubServer(news_payload, args.latency) as news:
+        nlp_manager = NLPManager(translator=LocalTranslator())
+        point_manager_at_stubs(nlp_manager, weather, news)
+        print(f"{args.requests} weather/news questions, stub latency {args.latency * 1000:.0f} ms")
+        sync_total = min(args.requests, 50)
+        latencies, elapsed = run_sync(nlp_manager, sync_total)
+        report(f"sync x{sync_total}", latencies, elapsed)
+        for concurrency in args.concurrency:
+            latencies, elapsed = asyncio.run(run_async(nlp_manager, args.requests, concurrency))
+            report(f"async c={concurrency}", latencies, elapsed)
+        print(f"  stub requests: weather {weather.requests}, news {news.requests}; caches {nlp_manager.cache_stats()}")
+
+if __name__ == '__main__':
+    main()
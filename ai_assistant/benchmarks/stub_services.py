@@ -0,0 +1,325 @@
+# benchmarks/stub_services.py
+#
+# Local stand-ins for the weather and news APIs and the translator used by NLPManager, the Gmail API
+# client used by TaskManager and the Speech-to-Text and Text-to-Speech clients used by SpeechManager.
+# A payload function returns the JSON body, or (status, body) for an error response.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from modules.recognition import Transcript
+
+def weather_payload(query):
+    location = query.get('q', [''])[0]
+    if not location or location.lower().startswith('nowhere'):
+        return 400, {'error': {'code': 1006, 'message': 'No matching location found.'}}
+    if location.lower().startswith('badkey'):
+        return 401, {'error': {'code': 2006, 'message': 'API key is invalid.'}}
+    return {'location': {'name': location}, 'current': {'temp_c': 18.5, 'condition': {'text': 'Partly cloudy'}}}
+
+def news_payload(query):
+    topic = query.get('q', [''])[0]
+    if topic.lower().startswith('ratelimited'):
+        return 429, {'status': 'error', 'code': 'rateLimited', 'message': 'You have made too many requests recently.'}
+    return {'status': 'ok', 'articles': [{'description': f"Story {i} about {topic}."} for i in range(8)]}
+
+class StubServer:
+    def __init__(self, payload, latency=0.05):
+        self.payload = payload
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.latency)
+                payload = stub.payload(parse_qs(urlparse(self.path).query))
+                status, payload = payload if isinstance(payload, tuple) else (200, payload)
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def point_manager_at_stubs(nlp_manager, weather_server, news_server):
+    nlp_manager.weather_api_url = weather_server.url
+    nlp_manager.news_api_url = news_server.url
+
+class Translated:
+    def __init__(self, text, src, dest, origin):
+        self.text = text
+        self.src = src
+        self.dest = dest
+        self.origin = origin
+
+class LocalTranslator:
+    # Offline stand-in with the googletrans Translator interface: a list costs one request per item,
+    # and a multi-line string is translated line by line in one request, as the web service does
+    def __init__(self, translations=None, latency=0.0):
+        self.translations = translations or {}
+        self.latency = latency
+        self.calls = 0
+        self.texts_translated = 0
+
+    def translate(self, text, dest='en', src='auto'):
+        if isinstance(text, list):
+            return [self.translate(item, dest, src) for item in text]
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        lines = text.split('\n')
+        self.texts_translated += len(lines)
+        translated = '\n'.join(self.translations.get((line, dest), line) for line in lines)
+        return Translated(translated, src, dest, text)
+
+class LocalRecognizer:
+    # Offline stand-in for the Speech-to-Text API: every bytes_per_word bytes of audio reveal the next
+    # word of a scripted transcript, and each segment of words_per_segment words ends in a final result
+    def __init__(self, transcript, bytes_per_word=3200, words_per_segment=8, latency=0.0):
+        self.words = transcript.split()
+        self.bytes_per_word = bytes_per_word
+        self.words_per_segment = words_per_segment
+        self.latency = latency
+        self.calls = 0
+        self.chunks = 0
+
+    def recognize(self, content, sample_rate=16000, language_code='en-US'):
+        return [result.text for result in self.stream([content], sample_rate, language_code, interim_results=False)]
+
+    def stream(self, chunks, sample_rate=16000, language_code='en-US', interim_results=True):
+        self.calls += 1
+        received = 0
+        segment_start = 0
+        revealed = 0
+        reported = 0
+        for chunk in chunks:
+            self.chunks += 1
+            if self.latency:
+                time.sleep(self.latency)
+            received += len(chunk)
+            revealed = min(len(self.words), received // self.bytes_per_word)
+            while revealed - segment_start >= self.words_per_segment:
+                segment_end = segment_start + self.words_per_segment
+                yield Transcript(' '.join(self.words[segment_start:segment_end]), True, 1.0)
+                segment_start = segment_end
+            if interim_results and revealed > max(segment_start, reported):
+                reported = revealed
+                yield Transcript(' '.join(self.words[segment_start:revealed]), False, 0.5)
+        if revealed > segment_start:
+            yield Transcript(' '.join(self.words[segment_start:revealed]), True, 1.0)
+
+class LocalSynthesizer:
+    # Offline stand-in for the Text-to-Speech API; returns deterministic bytes and counts calls
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def synthesize(self, text, language_code, voice_name=None, encoding='MP3'):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return f"{encoding}|{language_code}|{voice_name or ''}|{text}".encode('utf-8')
+
+class LocalHttpError(Exception):
+    # Carries resp.status like googleapiclient.errors.HttpError
+    def __init__(self, status, reason=''):
+        super().__init__(f"HTTP {status} {reason}".strip())
+        self.resp = type('Response', (), {'status': status})()
+
+class LocalRequest:
+    def __init__(self, service, handler):
+        self.service = service
+        self.handler = handler
+
+    def execute(self, http=None):
+        with self.service.lock:
+            self.service.http_calls += 1
+        return self.handler()
+
+class LocalBatch:
+    def __init__(self, service, callback=None):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        if len(self.requests) >= self.service.max_batch_size:
+            raise ValueError(f"Batch requests are limited to {self.service.max_batch_size} calls")
+        self.requests.append((request, callback or self.callback, request_id or str(len(self.requests))))
+
+    def execute(self, http=None):
+        # One HTTP round trip for the whole batch, with a result or error per call
+        with self.service.lock:
+            self.service.http_calls += 1
+            self.service.batch_calls += 1
+        for request, callback, request_id in self.requests:
+            try:
+                response, error = request.handler(), None
+            except Exception as e:
+                response, error = None, e
+            callback(request_id, response, error)
+
+class LocalGmailService:
+    # Offline stand-in for the Gmail API client: messages().list/get, history().list, getProfile and
+    # batch requests over an in-memory mailbox, with injectable transient failures
+    def __init__(self, max_batch_size=100):
+        self.max_batch_size = max_batch_size
+        self.mailbox = {}
+        self.order = []
+        # Ids are never reused, even after a message is deleted
+        self.next_id = 1
+        self.changes = []
+        self.history_id = 1000
+        self.min_history_id = self.history_id
+        self.transient_failures = {}
+        self.lock = threading.Lock()
+        self.http_calls = 0
+        self.batch_calls = 0
+        self.messages_fetched = 0
+        self.labels_fetched = 0
+
+    def _record(self, **change):
+        self.history_id += 1
+        self.changes.append(dict(change, id=str(self.history_id)))
+        return str(self.history_id)
+
+    def add_message(self, subject, body='', label_ids=('INBOX',)):
+        message_id = f"{self.next_id:016x}"
+        self.next_id += 1
+        message = {
+            'id': message_id,
+            'threadId': message_id,
+            'labelIds': list(label_ids),
+            'snippet': body[:100],
+            'payload': {'headers': [{'name': 'Subject', 'value': subject}]},
+        }
+        message['historyId'] = self._record(messagesAdded=[{'message': {'id': message_id, 'threadId': message_id,
+                                                                         'labelIds': list(label_ids)}}])
+        self.mailbox[message_id] = message
+        self.order.append(message_id)
+        return message_id
+
+    def delete_message(self, message_id):
+        self.mailbox.pop(message_id)
+        self.order.remove(message_id)
+        self._record(messagesDeleted=[{'message': {'id': message_id}}])
+
+    def modify_labels(self, message_id, added=(), removed=()):
+        message = self.mailbox[message_id]
+        message['labelIds'] = [label for label in message['labelIds'] if label not in removed] + \
+            [label for label in added if label not in message['labelIds']]
+        message['historyId'] = self._record(
+            labelsAdded=[{'message': {'id': message_id}, 'labelIds': list(added)}] if added else [],
+            labelsRemoved=[{'message': {'id': message_id}, 'labelIds': list(removed)}] if removed else [])
+
+    def expire_history(self):
+        # Every history id handed out so far, the current one included, now answers 404, forcing a full sync;
+        # the profile moves on to the first id that is still valid
+        self.history_id += 1
+        self.min_history_id = self.history_id
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return LocalMessages(self)
+
+    def history(self):
+        return LocalHistory(self)
+
+    def getProfile(self, userId='me'):
+        return LocalRequest(self, lambda: {'emailAddress': 'local@example.com', 'historyId': str(self.history_id),
+                                           'messagesTotal': len(self.mailbox)})
+
+    def new_batch_http_request(self, callback=None):
+        return LocalBatch(self, callback)
+
+    def page(self, items, pageToken, maxResults):
+        start = int(pageToken or 0)
+        end = start + maxResults
+        return items[start:end], (str(end) if end < len(items) else None)
+
+class LocalMessages:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, userId='me', labelIds=None, q=None, pageToken=None, maxResults=100):
+        def handler():
+            # Newest first, like Gmail
+            ids = [message_id for message_id in reversed(self.service.order)
+                   if set(labelIds or ()) <= set(self.service.mailbox[message_id]['labelIds'])]
+            page, next_token = self.service.page(ids, pageToken, min(maxResults, 500))
+            response = {'resultSizeEstimate': len(ids)}
+            if page:
+                response['messages'] = [{'id': message_id, 'threadId': message_id} for message_id in page]
+            if next_token:
+                response['nextPageToken'] = next_token
+            return response
+        return LocalRequest(self.service, handler)
+
+    def get(self, userId='me', id=None, format='full'):
+        def handler():
+            failures = self.service.transient_failures.get(id, 0)
+            if failures:
+                self.service.transient_failures[id] = failures - 1
+                raise LocalHttpError(503, 'Backend Error')
+            if id not in self.service.mailbox:
+                raise LocalHttpError(404, 'Not Found')
+            message = json.loads(json.dumps(self.service.mailbox[id]))
+            with self.service.lock:
+                if format == 'minimal':
+                    # Ids and labels only, as Gmail returns for format='minimal'
+                    self.service.labels_fetched += 1
+                    message.pop('payload')
+                else:
+                    self.service.messages_fetched += 1
+            return message
+        return LocalRequest(self.service, handler)
+
+    def send(self, userId='me', body=None):
+        return LocalRequest(self.service, lambda: {'id': self.service.add_message('', label_ids=('SENT',))})
+
+class LocalHistory:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, userId='me', startHistoryId=None, pageToken=None, maxResults=100, labelId=None):
+        def handler():
+            if int(startHistoryId) < self.service.min_history_id:
+                raise LocalHttpError(404, 'Requested entity was not found.')
+            records = [record for record in self.service.changes if int(record['id']) > int(startHistoryId)]
+            page, next_token = self.service.page(records, pageToken, maxResults)
+            response = {'historyId': str(self.service.history_id)}
+            if page:
+                response['history'] = page
+            if next_token:
+                response['nextPageToken'] = next_token
+            return response
+        return LocalRequest(self.service, handler)
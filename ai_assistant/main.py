@@ -1,9 +1,11 @@
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Suppress TensorFlow INFO and WARNING messages
 
+import asyncio
 from modules.nlp import NLPManager
+from modules import metrics
 
-def main():
+async def main():
     nlp_manager = NLPManager()
 
     # Example Questions
@@ -14,9 +16,11 @@ def main():
         {"question": "What is the news about Elon Musk?", "language": "en"}
     ]
 
-    for q in questions:
+    # Questions are answered concurrently and printed in order
+    answers = await asyncio.gather(*(nlp_manager.answer_question_async(q['question'], q['language']) for q in questions))
+    for q, answer in zip(questions, answers):
         print(f"Question: {q['question']}")
-        print(f"Answer: {nlp_manager.answer_question(q['question'], q['language'])}")
+        print(f"Answer: {answer}")
         print("-" * 50)
 
     # Example Conversation
@@ -28,8 +32,14 @@ def main():
 
     for starter in conversation_starters:
         print(f"Conversation: {starter}")
-        print(f"Response: {nlp_manager.have_conversation(starter)}")
+        print(f"Response: {await nlp_manager.have_conversation_async(starter)}")
         print("-" * 50)
 
+    await nlp_manager.aclose()
+
+    # Where the time went in this run
+    for stage, summary in sorted(metrics.stage_summary().items()):
+        print(f"{stage}: {summary['count']} calls, p50 {summary['p50'] * 1000:.1f} ms, p95 {summary['p95'] * 1000:.1f} ms")
+
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
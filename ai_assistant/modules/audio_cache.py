@@ -0,0 +1,113 @@
+# modules/audio_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+AUDIO_EXTENSIONS = {
+    'MP3': '.mp3',
+    'LINEAR16': '.wav',
+    'OGG_OPUS': '.ogg',
+}
+
+def audio_key(text, language, voice, encoding):
+    return hashlib.sha256(json.dumps([text, language, voice, encoding]).encode('utf-8')).hexdigest()
+
+class AudioCache:
+    def __init__(self, max_memory_bytes=32 * 1024 * 1024, directory=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.memory_bytes = 0
+        # Disk files in least-recently-used order: key -> (path, size)
+        self.files = OrderedDict()
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scan()
+
+    def _scan(self):
+        found = []
+        for entry in os.scandir(self.directory):
+            name, extension = os.path.splitext(entry.name)
+            if entry.is_file() and extension != '.tmp':
+                stat = entry.stat()
+                found.append((stat.st_mtime, name, entry.path, stat.st_size))
+        for _, key, path, size in sorted(found):
+            self.files[key] = (path, size)
+            self.disk_bytes += size
+
+    def get(self, key):
+        with self.lock:
+            audio = self.entries.get(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+            if key in self.files:
+                path, _ = self.files[key]
+                try:
+                    with open(path, 'rb') as cached:
+                        audio = cached.read()
+                except FileNotFoundError:
+                    self._forget_file(key)
+                else:
+                    self.files.move_to_end(key)
+                    os.utime(path)
+                    self._remember(key, audio)
+                    self.disk_hits += 1
+                    return audio
+            self.misses += 1
+            return None
+
+    def set(self, key, audio, extension='.mp3'):
+        with self.lock:
+            self._remember(key, audio)
+            if self.directory and key not in self.files:
+                path = os.path.join(self.directory, f"{key}{extension}")
+                fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as temporary:
+                    temporary.write(audio)
+                os.replace(temporary_path, path)
+                self.files[key] = (path, len(audio))
+                self.disk_bytes += len(audio)
+                while self.disk_bytes > self.max_disk_bytes and len(self.files) > 1:
+                    oldest = next(iter(self.files))
+                    os.remove(self.files[oldest][0])
+                    self._forget_file(oldest)
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_memory_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self.entries[key] = audio
+        self.memory_bytes += len(audio)
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _forget_file(self, key):
+        _, size = self.files.pop(key)
+        self.disk_bytes -= size
+
+    def stats(self):
+        with self.lock:
+            return {
+                'memory_entries': len(self.entries),
+                'memory_bytes': self.memory_bytes,
+                'disk_entries': len(self.files),
+                'disk_bytes': self.disk_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+            }
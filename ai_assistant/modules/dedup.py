@@ -0,0 +1,199 @@
+# modules/dedup.py
+
+import hashlib
+import re
+import zlib
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1
+MISSING = object()
+
+# Digits are masked only in sentences this short, so "Page 12 of 300" and "Page 13 of 300"
+# collide while longer sentences that differ in a figure are kept
+SHORT_SENTENCE_WORDS = 6
+
+def normalize_sentence(sentence):
+    # Case, punctuation and spacing are ignored
+    words = re.findall(r'\w+', sentence.lower())
+    if len(words) <= SHORT_SENTENCE_WORDS:
+        words = [re.sub(r'\d+', '0', word) for word in words]
+    return ' '.join(words)
+
+def stable_hash(data):
+    # Signed 64-bit, so fingerprints fit a BIGINT column and mean the same in every process
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True)
+
+def exact_hash(normalized):
+    return stable_hash(normalized.encode('utf-8'))
+
+def shingles(normalized, size=3):
+    words = normalized.split()
+    if len(words) <= size:
+        return [normalized]
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+class MinHasher:
+    def __init__(self, num_bands=6, rows_per_band=8, seed=1):
+        # 6 bands of 8 rows put the LSH threshold near a Jaccard similarity of 0.8
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        rng = np.random.RandomState(seed)
+        num_perm = num_bands * rows_per_band
+        self.a = rng.randint(1, MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+        # Fixed multipliers fold each band into one 64-bit key, identical in every process
+        self.band_mix = rng.randint(1, 1 << 62, size=rows_per_band, dtype=np.int64).astype(np.uint64) * 2 + 1
+        self.band_offset = rng.randint(1, 1 << 62, size=num_bands, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, normalized):
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(normalized)),
+                             dtype=np.uint64) % MERSENNE_PRIME
+        return ((self.a * hashes + self.b) % MERSENNE_PRIME).min(axis=1)
+
+    def band_keys(self, normalized):
+        bands = self.signature(normalized).reshape(self.num_bands, self.rows_per_band)
+        # uint64 arithmetic wraps; viewed as int64 so keys fit a BIGINT column
+        return ((bands * self.band_mix).sum(axis=1) + self.band_offset).view(np.int64).tolist()
+
+class DedupIndex:
+    # Exact hashes and band keys, each mapped to the id of the committed document holding the sentence
+    # (None within a document, or without a fingerprint store)
+    def __init__(self):
+        self.exact = {}
+        self.bands = {}
+
+    def __len__(self):
+        return len(self.exact)
+
+    def add(self, key, band_keys, owner=None):
+        self.exact[key] = owner
+        self.bands.update(dict.fromkeys(band_keys, owner))
+
+    def update(self, other, owner=None):
+        self.exact.update(dict.fromkeys(other.exact, owner))
+        self.bands.update(dict.fromkeys(other.bands, owner))
+
+    def values(self):
+        return self.exact.keys() | self.bands.keys()
+
+    def near(self, band_keys):
+        return any(band_key in self.bands for band_key in band_keys)
+
+class SentenceDeduplicator:
+    # Corpus scope: documents committed in this run are held in memory; earlier runs are looked up
+    # chunk by chunk in the fingerprint store the documents are opened with
+    def __init__(self, near_duplicates=True, num_bands=6, rows_per_band=8):
+        self.hasher = MinHasher(num_bands, rows_per_band) if near_duplicates else None
+        self.index = DedupIndex()
+        self.counts = {'kept': 0, 'exact_document': 0, 'near_document': 0, 'exact_corpus': 0, 'near_corpus': 0}
+        self.documents = 0
+
+    def fingerprint(self, sentence):
+        normalized = normalize_sentence(sentence)
+        return exact_hash(normalized), normalized
+
+    def band_keys(self, normalized):
+        return self.hasher.band_keys(normalized) if self.hasher is not None else ()
+
+    def fingerprints(self, sentences):
+        index = DedupIndex()
+        for sentence in sentences:
+            key, normalized = self.fingerprint(sentence)
+            if key not in index.exact:
+                index.add(key, self.band_keys(normalized))
+        return index.values()
+
+    def document(self, store=None):
+        return DocumentDeduplicator(self, store)
+
+    def merge(self, document, document_id=None):
+        self.index.update(document.index, document_id)
+        for name, count in document.counts.items():
+            self.counts[name] += count
+        self.documents += 1
+
+    def stats(self):
+        dropped = sum(self.counts.values()) - self.counts['kept']
+        seen = dropped + self.counts['kept']
+        return dict(self.counts, documents=self.documents, dropped=dropped,
+                    dropped_ratio=dropped / seen if seen else 0.0, corpus_size=len(self.index))
+
+class DocumentDeduplicator:
+    # Document scope; its sentences join the corpus only when the document commits.
+    # store.lookup(values) maps the exact hashes and band keys already stored to the documents holding them.
+    def __init__(self, corpus, store=None):
+        self.corpus = corpus
+        self.store = store
+        self.index = DedupIndex()
+        self.counts = {'kept': 0, 'exact_document': 0, 'near_document': 0, 'exact_corpus': 0, 'near_corpus': 0}
+        # Sentences dropped as duplicates of another document's: matched value -> id of that document
+        self.claims = {}
+
+    @property
+    def dropped(self):
+        return sum(self.counts.values()) - self.counts['kept']
+
+    def accept(self, sentence):
+        return bool(self.accept_many([sentence]))
+
+    def accept_many(self, sentences):
+        # Exact keys first; band keys only for sentences that are not exact duplicates.
+        # Each phase is one store lookup for the whole chunk instead of one per sentence.
+        candidates = []
+        for sentence in sentences:
+            key, normalized = self.corpus.fingerprint(sentence)
+            candidates.append((sentence, key, normalized))
+        stored = self.lookup({key for _, key, _ in candidates})
+        near_candidates = []
+        for sentence, key, normalized in candidates:
+            if key in self.index.exact:
+                self.counts['exact_document'] += 1
+            elif self.claim([key], self.corpus.index.exact, stored):
+                self.counts['exact_corpus'] += 1
+            else:
+                # Registered now so a repeat later in the chunk counts as a document duplicate
+                self.index.exact[key] = None
+                near_candidates.append((sentence, key, self.corpus.band_keys(normalized)))
+        stored = self.lookup({band_key for _, _, band_keys in near_candidates for band_key in band_keys})
+        kept = []
+        for sentence, key, band_keys in near_candidates:
+            if self.index.near(band_keys):
+                self.counts['near_document'] += 1
+                del self.index.exact[key]
+            elif self.claim(band_keys, self.corpus.index.bands, stored):
+                self.counts['near_corpus'] += 1
+                del self.index.exact[key]
+            else:
+                self.index.bands.update(dict.fromkeys(band_keys))
+                self.counts['kept'] += 1
+                kept.append(sentence)
+        return kept
+
+    def claim(self, values, committed, stored):
+        # Records which document holds the first matching value, so that document hands the sentence
+        # over instead of deleting it when it is replaced
+        for value in values:
+            owner = committed[value] if value in committed else stored.get(value, MISSING)
+            if owner is not MISSING:
+                if owner is not None:
+                    self.claims[value] = owner
+                return True
+        return False
+
+    def lookup(self, values):
+        if self.store is None or not values:
+            return {}
+        return self.store.lookup(values)
+
+    def filter(self, sentences, chunk_size=1000):
+        chunk = []
+        for sentence in sentences:
+            chunk.append(sentence)
+            if len(chunk) >= chunk_size:
+                yield from self.accept_many(chunk)
+                chunk = []
+        if chunk:
+            yield from self.accept_many(chunk)
+
+    def commit(self, document_id=None):
+        self.corpus.merge(self, document_id)
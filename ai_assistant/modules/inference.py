@@ -0,0 +1,136 @@
+# modules/inference.py
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from modules.metrics import timed
+
+def quantize_model(model):
+    import torch
+    # Dynamic int8 quantization of the Linear layers; activations stay fp32
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def group_by_length(encoded):
+    # BERT numbers positions from the first token and generate() does not take position_ids, so padding
+    # a prompt would shift it; prompts of equal length run together and need no padding
+    groups = {}
+    for position, ids in enumerate(encoded):
+        groups.setdefault(len(ids), []).append(position)
+    return list(groups.values())
+
+class InferenceEngine:
+    def __init__(self, model_provider, tokenizer_provider, max_batch_size=8, max_wait_ms=10, num_threads=None,
+                 quantize=False, generate_kwargs=None):
+        self.model_provider = model_provider
+        self.tokenizer_provider = tokenizer_provider
+        # A micro-batch runs once it is full or its first request has waited max_wait_ms
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.num_threads = num_threads
+        self.quantize = quantize
+        self.generate_kwargs = generate_kwargs or {'max_new_tokens': 50, 'num_beams': 5, 'early_stopping': True}
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.source_model = None
+        self.serving_model = None
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.failures = 0
+        self.generate_calls = 0
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='inference-engine', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def submit(self, text):
+        future = Future()
+        self.queue.put((text, future))
+        return future
+
+    def generate(self, text, timeout=None):
+        return self.submit(text).result(timeout)
+
+    async def generate_async(self, text):
+        return await asyncio.wrap_future(self.submit(text))
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'requests': self.requests,
+                'batches': self.batches,
+                'failures': self.failures,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'mean_generate_size': self.requests / self.generate_calls if self.generate_calls else 0.0,
+                'quantized': self.quantize,
+            }
+
+    def model(self):
+        # Follows hot-swapped models; the int8 copy is rebuilt only when the source model changes
+        model = self.model_provider()
+        if model is not self.source_model:
+            self.source_model = model
+            self.serving_model = quantize_model(model) if self.quantize else model
+            self.serving_model.eval()
+        return self.serving_model
+
+    def _run(self):
+        if self.num_threads:
+            import torch
+            torch.set_num_threads(self.num_threads)
+        while not self.stop_event.is_set():
+            try:
+                batch = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.run_batch(batch)
+
+    @timed('inference_batch')
+    def run_batch(self, batch):
+        import torch
+        texts = [text for text, _ in batch]
+        try:
+            tokenizer = self.tokenizer_provider()
+            model = self.model()
+            encoded = tokenizer(texts)['input_ids']
+            groups = group_by_length(encoded)
+            responses = [None] * len(texts)
+            with torch.inference_mode():
+                for group in groups:
+                    outputs = model.generate(torch.tensor([encoded[position] for position in group]),
+                                             **self.generate_kwargs)
+                    for position, response in zip(group, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                        responses[position] = response
+        except Exception as e:
+            with self.lock:
+                self.failures += 1
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self.lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.generate_calls += len(groups)
+        for (_, future), response in zip(batch, responses):
+            future.set_result(response)
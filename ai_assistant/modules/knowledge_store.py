@@ -0,0 +1,97 @@
+# modules/knowledge_store.py
+
+import sys
+import threading
+from array import array
+from sqlalchemy import text
+
+class KnowledgeStore:
+    def __init__(self, table='knowledge'):
+        self.table = table
+        self.positions = {}
+        self.questions = []
+        # Answers live in one packed UTF-8 buffer, addressed by per-row offsets and lengths
+        self.buffer = bytearray()
+        self.starts = array('Q')
+        self.lengths = array('L')
+        self.high_water_mark = 0
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+        self.stop_event = threading.Event()
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __contains__(self, question):
+        return question in self.positions
+
+    def __iter__(self):
+        return iter(list(self.questions))
+
+    def __getitem__(self, question):
+        position = self.positions[question]
+        start = self.starts[position]
+        return self.buffer[start:start + self.lengths[position]].decode('utf-8')
+
+    def get(self, question, default=None):
+        try:
+            return self[question]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        return ((question, self[question]) for question in self)
+
+    def add(self, question, answer):
+        encoded = (answer or '').encode('utf-8')
+        with self.lock:
+            position = self.positions.get(question)
+            start = len(self.buffer)
+            self.buffer.extend(encoded)
+            if position is None:
+                question = sys.intern(question)
+                self.starts.append(start)
+                self.lengths.append(len(encoded))
+                self.questions.append(question)
+                self.positions[question] = len(self.questions) - 1
+                return True
+            self.starts[position] = start
+            self.lengths[position] = len(encoded)
+            return False
+
+    def load(self, engine, batch_size=10000):
+        # Only rows above the high-water mark are read; a server-side cursor streams them
+        # in batches without building ORM objects
+        query = text(f"SELECT id, question, answer FROM {self.table} WHERE id > :high_water_mark ORDER BY id")
+        new_questions = []
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+                query, {'high_water_mark': self.high_water_mark})
+            for row_id, question, answer in result:
+                if question is None:
+                    continue
+                if self.add(question, answer):
+                    new_questions.append(question)
+                self.high_water_mark = max(self.high_water_mark, row_id)
+        return new_questions
+
+    def start_auto_refresh(self, refresh, interval):
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return
+        self.stop_event.clear()
+
+        def run():
+            while not self.stop_event.wait(interval):
+                try:
+                    refresh()
+                except Exception as e:
+                    print(f"Error refreshing knowledge base: {e}")
+
+        self.refresh_thread = threading.Thread(target=run, name='knowledge-refresh', daemon=True)
+        self.refresh_thread.start()
+
+    def stop_auto_refresh(self):
+        self.stop_event.set()
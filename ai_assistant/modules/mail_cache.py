@@ -0,0 +1,86 @@
+# modules/mail_cache.py
+
+import json
+import sqlite3
+import threading
+
+class MessageCache:
+    def __init__(self, path=None):
+        self.messages = {}
+        self.history_id = None
+        self.lock = threading.Lock()
+        self.db = None
+        if path:
+            # Optional persistent copy, so a restart resumes incremental sync instead of rescanning
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS messages (id TEXT PRIMARY KEY, data TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.commit()
+            for message_id, data in self.db.execute("SELECT id, data FROM messages"):
+                self.messages[message_id] = json.loads(data)
+            row = self.db.execute("SELECT value FROM state WHERE key = 'history_id'").fetchone()
+            self.history_id = row[0] if row else None
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __contains__(self, message_id):
+        return message_id in self.messages
+
+    def get(self, message_id):
+        with self.lock:
+            return self.messages.get(message_id)
+
+    def get_many(self, message_ids):
+        with self.lock:
+            return {message_id: self.messages[message_id] for message_id in message_ids if message_id in self.messages}
+
+    def all(self, label_ids=None):
+        with self.lock:
+            messages = list(self.messages.values())
+        if label_ids:
+            messages = [message for message in messages if set(label_ids) <= set(message.get('labelIds', []))]
+        return messages
+
+    def put_many(self, messages):
+        with self.lock:
+            for message in messages:
+                self.messages[message['id']] = message
+            if self.db is not None:
+                self.db.executemany("INSERT OR REPLACE INTO messages (id, data) VALUES (?, ?)",
+                                    [(message['id'], json.dumps(message)) for message in messages])
+                self.db.commit()
+
+    def delete_many(self, message_ids):
+        with self.lock:
+            for message_id in message_ids:
+                self.messages.pop(message_id, None)
+            if self.db is not None:
+                self.db.executemany("DELETE FROM messages WHERE id = ?", [(message_id,) for message_id in message_ids])
+                self.db.commit()
+
+    def update_labels(self, message_id, added=(), removed=()):
+        with self.lock:
+            message = self.messages.get(message_id)
+        if message is None:
+            return False
+        labels = [label for label in message.get('labelIds', []) if label not in removed]
+        labels.extend(label for label in added if label not in labels)
+        self.put_many([dict(message, labelIds=labels)])
+        return True
+
+    def set_history_id(self, history_id):
+        with self.lock:
+            self.history_id = history_id
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('history_id', ?)", (history_id,))
+                self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.messages.clear()
+            self.history_id = None
+            if self.db is not None:
+                self.db.execute("DELETE FROM messages")
+                self.db.execute("DELETE FROM state")
+                self.db.commit()
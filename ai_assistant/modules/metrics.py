@@ -0,0 +1,209 @@
+# modules/metrics.py
+
+import functools
+import inspect
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds; covers cache hits (sub-millisecond) up to OCR and training runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = 'assistant_stage_seconds'
+STAGE_ERRORS = 'assistant_stage_errors_total'
+
+def label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_samples=10000):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        # Percentiles come from the most recent samples; buckets and sum cover everything
+        self.samples = deque(maxlen=max_samples)
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.count += 1
+            self.sum += value
+            self.samples.append(value)
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[position] += 1
+                    break
+
+    def summary(self):
+        with self.lock:
+            ordered = sorted(self.samples)
+            count, total = self.count, self.sum
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else 0.0,
+            'p50': percentile(ordered, 0.50),
+            'p95': percentile(ordered, 0.95),
+            'p99': percentile(ordered, 0.99),
+            'max': ordered[-1] if ordered else 0.0,
+        }
+
+class MetricsRegistry:
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name, help='', **labels):
+        key = (name, label_key(labels))
+        metric = self.counters.get(key)
+        if metric is None:
+            with self.lock:
+                metric = self.counters.setdefault(key, Counter())
+                self.help.setdefault(name, help)
+        return metric
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, label_key(labels))
+        metric = self.histograms.get(key)
+        if metric is None:
+            with self.lock:
+                metric = self.histograms.setdefault(key, Histogram(buckets))
+                self.help.setdefault(name, help)
+        return metric
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.counter(STAGE_ERRORS if name == STAGE_SECONDS else f"{name}_errors_total", **labels).inc()
+            raise
+        finally:
+            self.histogram(name, **labels).observe(time.perf_counter() - started)
+
+    def snapshot(self):
+        counters = {}
+        for (name, key), metric in list(self.counters.items()):
+            counters[name + format_labels(key)] = metric.value
+        histograms = {}
+        for (name, key), metric in list(self.histograms.items()):
+            histograms[name + format_labels(key)] = metric.summary()
+        return {'counters': counters, 'histograms': histograms}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent, sort_keys=True)
+
+    def to_prometheus(self):
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# HELP {name} {self.help.get(name) or name}")
+            lines.append(f"# TYPE {name} counter")
+            for (metric_name, key), metric in sorted(self.counters.items()):
+                if metric_name == name:
+                    lines.append(f"{name}{format_labels(key)} {metric.value}")
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# HELP {name} {self.help.get(name) or name}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric_name, key), metric in sorted(self.histograms.items()):
+                if metric_name != name:
+                    continue
+                with metric.lock:
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric.buckets, metric.bucket_counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{format_labels(key, [('le', repr(bound))])} {cumulative}")
+                    lines.append(f"{name}_bucket{format_labels(key, [('le', '+Inf')])} {metric.count}")
+                    lines.append(f"{name}_sum{format_labels(key)} {metric.sum}")
+                    lines.append(f"{name}_count{format_labels(key)} {metric.count}")
+        return '\n'.join(lines) + '\n'
+
+    def drain(self):
+        # Raw state for another process to merge(); used by ingestion workers reporting to the parent
+        with self.lock:
+            state = {
+                'counters': [(name, key, metric.value) for (name, key), metric in self.counters.items()],
+                'histograms': [(name, key, list(metric.bucket_counts), metric.count, metric.sum, list(metric.samples))
+                               for (name, key), metric in self.histograms.items()],
+            }
+            self.counters.clear()
+            self.histograms.clear()
+        return state
+
+    def merge(self, state):
+        for name, key, value in state['counters']:
+            self.counter(name, **dict(key)).inc(value)
+        for name, key, bucket_counts, count, total, samples in state['histograms']:
+            metric = self.histogram(name, **dict(key))
+            with metric.lock:
+                for position, bucket_count in enumerate(bucket_counts):
+                    metric.bucket_counts[position] += bucket_count
+                metric.count += count
+                metric.sum += total
+                metric.samples.extend(samples)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+REGISTRY = MetricsRegistry()
+
+def count(name, amount=1, **labels):
+    REGISTRY.counter(name, **labels).inc(amount)
+
+def observe(name, value, **labels):
+    REGISTRY.histogram(name, **labels).observe(value)
+
+def stage(name):
+    return REGISTRY.timer(STAGE_SECONDS, stage=name)
+
+def timed(name):
+    # Records every call of the decorated function (sync or async) as one sample of the stage
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def stage_summary(registry=REGISTRY):
+    summary = {}
+    for (name, key), metric in list(registry.histograms.items()):
+        if name == STAGE_SECONDS:
+            summary[dict(key)['stage']] = metric.summary()
+    return summary
@@ -0,0 +1,44 @@
+# modules/model_registry.py
+
+import threading
+
+# Process-wide registry so every NLPManager shares one copy of each tokenizer/model
+_registry = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+def get_shared(key, factory):
+    value = _registry.get(key)
+    if value is not None:
+        return value
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    # Per-key lock: loading the model does not block a tokenizer lookup
+    with lock:
+        value = _registry.get(key)
+        if value is None:
+            value = factory()
+            _registry[key] = value
+    return value
+
+def get_tokenizer(name='bert-base-uncased'):
+    def load():
+        from transformers import BertTokenizer
+        return BertTokenizer.from_pretrained(name)
+    return get_shared(('tokenizer', name), load)
+
+def get_model(name='bert-base-uncased'):
+    def load():
+        from transformers import BertForMaskedLM
+        model = BertForMaskedLM.from_pretrained(name)
+        model.eval()
+        return model
+    return get_shared(('model', name), load)
+
+def is_loaded(kind, name='bert-base-uncased'):
+    return (kind, name) in _registry
+
+def clear():
+    with _registry_lock:
+        _registry.clear()
+        _locks.clear()
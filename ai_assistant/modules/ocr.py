@@ -0,0 +1,86 @@
+# modules/ocr.py
+
+import hashlib
+import os
+import tempfile
+import numpy as np
+import pytesseract
+from PIL import Image
+
+class OcrCache:
+    # One text file per OCR result, named by the hash of its key; safe to share between worker processes
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.txt")
+
+    def get(self, key):
+        try:
+            with open(self.path(key), encoding='utf-8') as cached:
+                text = cached.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def set(self, key, text):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent reader never sees a partial file
+        fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as temporary:
+            temporary.write(text)
+        os.replace(temporary_path, path)
+
+def otsu_threshold(pixels):
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_background = np.cumsum(histogram)
+    weight_foreground = weight_background[-1] - weight_background
+    sum_background = np.cumsum(histogram * levels)
+    mean_background = sum_background / np.maximum(weight_background, 1)
+    mean_foreground = (sum_background[-1] - sum_background) / np.maximum(weight_foreground, 1)
+    between_class_variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+    return int(np.argmax(between_class_variance))
+
+def prepare_for_ocr(image, max_side=3600, binarize=True):
+    # Grayscale, capped resolution and a black/white image keep tesseract fast without hurting accuracy
+    image = image.convert('L')
+    scale = max_side / max(image.size)
+    if scale < 1:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+    if binarize:
+        pixels = np.asarray(image)
+        image = Image.fromarray(np.where(pixels > otsu_threshold(pixels), 255, 0).astype(np.uint8))
+    return image
+
+class OcrEngine:
+    def __init__(self, cache=None, lang='eng', dpi=300, max_side=3600, binarize=True):
+        self.cache = cache
+        self.lang = lang
+        self.dpi = dpi
+        self.max_side = max_side
+        self.binarize = binarize
+        self.runs = 0
+
+    def settings_key(self):
+        # Changing any OCR setting invalidates earlier results
+        return f"{self.lang}:{self.dpi}:{self.max_side}:{int(self.binarize)}"
+
+    def recognize(self, content_key, load_image):
+        key = f"{content_key}:{self.settings_key()}"
+        if self.cache is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                return text
+        image = prepare_for_ocr(load_image(), self.max_side, self.binarize)
+        text = pytesseract.image_to_string(image, lang=self.lang)
+        self.runs += 1
+        if self.cache is not None:
+            self.cache.set(key, text)
+        return text
@@ -0,0 +1,111 @@
+# modules/question_index.py
+
+import math
+import re
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r"\w+")
+CONTRACTION_PATTERN = re.compile(r"\b(what|who|where|when|why|how)'s\b")
+# Conversational wrappers around the question itself; dropped from queries before scoring
+FILLER_PATTERN = re.compile(r"^(?:(?:hey|hi|ok|okay|so|please|can you|could you|would you|do you know|tell me|"
+                            r"i want to know|i would like to know|i wonder)\s+)+|\s+please$")
+# A query asking "who" is never answered by a stored "what" question, however many other words they share
+QUESTION_WORDS = frozenset(('what', 'who', 'where', 'when', 'why', 'how', 'which'))
+
+def normalize_question(text):
+    text = CONTRACTION_PATTERN.sub(r"\1 is", text.lower().replace("\u2019", "'"))
+    return " ".join(TOKEN_PATTERN.findall(text))
+
+class QuestionIndex:
+    def __init__(self, questions=(), threshold=0.9, k1=1.2, b=0.75, common_term_ratio=0.05):
+        # threshold is tuned with benchmarks/bench_question_index.py --sweep against held-out and reworded
+        # questions whose stored answer would be wrong
+        self.threshold = threshold
+        self.k1 = k1
+        self.b = b
+        self.common_term_ratio = common_term_ratio
+        self.questions = []
+        self.doc_terms = []
+        self.total_length = 0
+        self.exact = {}
+        self.postings = defaultdict(list)
+        for question in questions:
+            self.add(question)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def add(self, question):
+        normalized = normalize_question(question)
+        if normalized in self.exact:
+            return
+        doc_id = len(self.questions)
+        terms = Counter(normalized.split())
+        self.questions.append(question)
+        self.doc_terms.append(terms)
+        self.total_length += sum(terms.values())
+        self.exact[normalized] = doc_id
+        for term in terms:
+            self.postings[term].append(doc_id)
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.questions) - df + 0.5) / (df + 0.5))
+
+    def search(self, question, k=1):
+        normalized = normalize_question(question)
+        doc_id = self.exact.get(normalized)
+        if doc_id is None:
+            normalized = FILLER_PATTERN.sub("", normalized)
+            doc_id = self.exact.get(normalized)
+        if doc_id is not None:
+            return [(self.questions[doc_id], 1.0)]
+        query_terms = set(normalized.split())
+        if not query_terms or not self.questions:
+            return []
+
+        # Candidates come from the rarer query terms; very common words ("what", "is")
+        # are still scored but never used to enumerate postings
+        max_df = max(1, int(len(self.questions) * self.common_term_ratio))
+        rare_terms = [term for term in query_terms if 0 < len(self.postings.get(term, ())) <= max_df]
+        candidate_terms = rare_terms or query_terms
+        candidates = set()
+        for term in candidate_terms:
+            candidates.update(self.postings.get(term, ()))
+        if not candidates:
+            return []
+
+        # Words never seen in any question get the full weight of a term with no postings: "Who invented
+        # Python?" is not "What is Python?" just because the index has never seen "invented"
+        idf = {term: self.idf(term) for term in query_terms}
+        question_words = query_terms & QUESTION_WORDS
+        query_weight = sum(idf.values())
+        avg_length = self.total_length / len(self.questions)
+        scored = []
+        for doc_id in candidates:
+            terms = self.doc_terms[doc_id]
+            if question_words and question_words.isdisjoint(terms) and not QUESTION_WORDS.isdisjoint(terms):
+                continue
+            length = sum(terms.values())
+            bm25 = 0.0
+            covered = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    covered += idf[term]
+                    bm25 += idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+            # The share of the query's weight the stored question contains, balanced against the share
+            # of the stored question the query contains; BM25 only breaks ties
+            query_coverage = covered / query_weight
+            doc_weight = sum(self.idf(term) for term in terms)
+            doc_coverage = sum(self.idf(term) for term in terms if term in query_terms) / doc_weight
+            if query_coverage and doc_coverage:
+                scored.append((2 * query_coverage * doc_coverage / (query_coverage + doc_coverage), bm25, doc_id))
+        scored.sort(reverse=True)
+        return [(self.questions[doc_id], score) for score, _, doc_id in scored[:k]]
+
+    def best_match(self, question):
+        results = self.search(question, k=1)
+        if results and results[0][1] >= self.threshold:
+            return results[0][0]
+        return None
@@ -0,0 +1,37 @@
+# modules/recognition.py
+
+import os
+
+class Transcript:
+    def __init__(self, text, is_final, stability=0.0):
+        self.text = text
+        self.is_final = is_final
+        self.stability = stability
+
+    def __repr__(self):
+        return f"Transcript({self.text!r}, is_final={self.is_final})"
+
+def chunk_size_for(sample_rate, chunk_ms=100, sample_width=2):
+    # 100 ms of 16-bit mono audio per request is what streaming recognizers expect
+    return sample_rate * sample_width * chunk_ms // 1000
+
+def iter_audio_chunks(source, chunk_size):
+    # Accepts a file path, a binary file object or any iterable of byte strings
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as audio:
+            yield from iter_audio_chunks(audio, chunk_size)
+        return
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    buffer = bytearray()
+    for data in source:
+        buffer.extend(data)
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
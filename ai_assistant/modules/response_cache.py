@@ -0,0 +1,146 @@
+# modules/response_cache.py
+
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+def normalize_key(text):
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', text.lower())).strip()
+
+class ResponseCache:
+    def __init__(self, ttl, max_size=1000, stale_ttl=None):
+        self.ttl = ttl
+        # How long past expiry a value may still be served while it is refreshed
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.refresh_tasks = set()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'coalesced': self.coalesced,
+                'refreshes': self.refreshes,
+                'errors': self.errors,
+            }
+
+    def _lookup(self, key):
+        # Returns (cached value or None, whether a refresh should start, in-flight future, whether caller leads)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value, False, None, False
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    refresh = key not in self.inflight
+                    if refresh:
+                        self.inflight[key] = Future()
+                        self.refreshes += 1
+                    return value, refresh, None, False
+                del self.entries[key]
+            future = self.inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, False, future, False
+            self.misses += 1
+            future = self.inflight[key] = Future()
+            return None, False, future, True
+
+    def _store(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            future = self.inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def _fail(self, key, error):
+        with self.lock:
+            self.errors += 1
+            future = self.inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def _fetch(self, key, fetch):
+        try:
+            value = fetch()
+        except Exception as e:
+            self._fail(key, e)
+            raise
+        self._store(key, value)
+        return value
+
+    def get_or_fetch(self, key, fetch):
+        value, refresh, future, leader = self._lookup(key)
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+        if future is None:
+            return value
+        if leader:
+            return self._fetch(key, fetch)
+        return future.result()
+
+    def _refresh(self, key, fetch):
+        try:
+            self._fetch(key, fetch)
+        except Exception:
+            pass
+
+    async def get_or_fetch_async(self, key, fetch):
+        value, refresh, future, leader = self._lookup(key)
+        if refresh:
+            task = asyncio.get_running_loop().create_task(self._refresh_async(key, fetch))
+            self.refresh_tasks.add(task)
+            task.add_done_callback(lambda task: self._refresh_done(key, task))
+        if future is None:
+            return value
+        if leader:
+            try:
+                value = await fetch()
+            except BaseException as e:
+                # Also release followers when the leading task is cancelled
+                self._fail(key, e if isinstance(e, Exception) else RuntimeError("fetch cancelled"))
+                raise
+            self._store(key, value)
+            return value
+        return await asyncio.wrap_future(future)
+
+    async def _refresh_async(self, key, fetch):
+        try:
+            self._store(key, await fetch())
+        except Exception as e:
+            self._fail(key, e)
+
+    def _refresh_done(self, key, task):
+        self.refresh_tasks.discard(task)
+        # Cancelled before or during the fetch (e.g. the event loop shutting down): release followers,
+        # as the leader path does, instead of leaving them waiting on a future nobody resolves
+        if task.cancelled():
+            self._fail(key, RuntimeError("refresh cancelled"))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,268 @@
+# modules/semantic_search.py
+
+import json
+import os
+import numpy as np
+from sqlalchemy import text, bindparam
+
+SENTENCE_TABLES = ('book_knowledge', 'research_paper_knowledge')
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentence_index')
+
+class BertSentenceEmbedder:
+    def __init__(self, tokenizer, model, max_length=128):
+        self.tokenizer = tokenizer
+        # BertForMaskedLM wraps the encoder; mean-pool its last hidden state
+        self.encoder = getattr(model, 'bert', model)
+        self.max_length = max_length
+
+    def __call__(self, sentences):
+        import torch
+        inputs = self.tokenizer(sentences, padding=True, truncation=True, max_length=self.max_length,
+                                return_tensors='pt')
+        with torch.inference_mode():
+            hidden = self.encoder(**inputs).last_hidden_state
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return pooled.float().numpy()
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def iter_sentence_rows(connection, tables=SENTENCE_TABLES, page_size=10000):
+    # Keyset pagination so the scan never holds more than one page of sentences
+    for table_code, table in enumerate(tables):
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                text(f"SELECT id, sentence FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': page_size},
+            ).fetchall()
+            if not rows:
+                break
+            for row_id, sentence in rows:
+                yield table_code, row_id, sentence
+            last_id = rows[-1][0]
+
+def fetch_sentences(connection, hits, tables=SENTENCE_TABLES):
+    by_table = {}
+    for table_code, row_id, _ in hits:
+        by_table.setdefault(table_code, []).append(int(row_id))
+    sentences = {}
+    for table_code, row_ids in by_table.items():
+        query = text(f"SELECT id, sentence FROM {tables[table_code]} WHERE id IN :ids").bindparams(
+            bindparam('ids', expanding=True))
+        for row_id, sentence in connection.execute(query, {'ids': row_ids}):
+            sentences[(table_code, row_id)] = sentence
+    return [sentences.get((table_code, int(row_id))) for table_code, row_id, _ in hits]
+
+class SentenceVectorIndex:
+    def __init__(self, directory, vectors, rows, meta, ivf_centroids=None, ivf_order=None, ivf_offsets=None):
+        self.directory = directory
+        self.vectors = vectors
+        self.rows = rows
+        self.meta = meta
+        self.ivf_centroids = ivf_centroids
+        self.ivf_order = ivf_order
+        self.ivf_offsets = ivf_offsets
+
+    def __len__(self):
+        return len(self.rows)
+
+    @staticmethod
+    def exists(directory=DEFAULT_INDEX_DIR):
+        return os.path.exists(os.path.join(directory, 'meta.json'))
+
+    @classmethod
+    def build(cls, rows, embed_fn, directory=DEFAULT_INDEX_DIR, batch_size=64, dtype='float16', tables=SENTENCE_TABLES,
+              embedding_model=None):
+        os.makedirs(directory, exist_ok=True)
+        dim = None
+        count = 0
+        row_file = os.path.join(directory, 'rows.tmp')
+        vector_file = os.path.join(directory, 'vectors.tmp')
+        # Vectors are appended to a raw file, so the corpus size need not be known up front
+        with open(vector_file, 'wb') as vectors_out, open(row_file, 'wb') as rows_out:
+            batch = []
+
+            def flush():
+                nonlocal dim, count
+                vectors = normalize_rows(embed_fn([sentence for _, _, sentence in batch])).astype(dtype)
+                dim = vectors.shape[1]
+                vectors_out.write(vectors.tobytes())
+                ids = np.array([(table_code, row_id) for table_code, row_id, _ in batch], dtype=np.int64)
+                rows_out.write(ids.tobytes())
+                count += len(batch)
+                batch.clear()
+
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+
+        os.replace(vector_file, os.path.join(directory, 'vectors.bin'))
+        os.replace(row_file, os.path.join(directory, 'rows.bin'))
+        for name in ('ivf_centroids.npy', 'ivf_order.npy', 'ivf_offsets.npy'):
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+        # Queries must be embedded by the same weights; NLPManager refuses an index built by another model
+        meta = {'count': count, 'dim': dim or 0, 'dtype': dtype, 'tables': list(tables), 'embedding_model': embedding_model}
+        with open(os.path.join(directory, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+        return cls.open(directory)
+
+    @classmethod
+    def open(cls, directory=DEFAULT_INDEX_DIR):
+        with open(os.path.join(directory, 'meta.json'), 'r') as file:
+            meta = json.load(file)
+        count, dim = meta['count'], meta['dim']
+        if count:
+            vectors = np.memmap(os.path.join(directory, 'vectors.bin'), dtype=meta['dtype'], mode='r', shape=(count, dim))
+            rows = np.memmap(os.path.join(directory, 'rows.bin'), dtype=np.int64, mode='r', shape=(count, 2))
+        else:
+            vectors = np.zeros((0, dim), dtype=meta['dtype'])
+            rows = np.zeros((0, 2), dtype=np.int64)
+        ivf = {}
+        for name in ('ivf_centroids', 'ivf_order', 'ivf_offsets'):
+            path = os.path.join(directory, f'{name}.npy')
+            if os.path.exists(path):
+                ivf[name] = np.load(path, mmap_mode='r')
+        return cls(directory, vectors, rows, meta, **ivf)
+
+    def build_ivf(self, n_lists=None, sample_size=100000, iterations=10, block_size=65536, seed=0):
+        count = len(self)
+        if not count:
+            return
+        n_lists = n_lists or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+        sample_vectors = np.asarray(self.vectors[sample], dtype=np.float32)
+        centroids = sample_vectors[rng.choice(len(sample_vectors), size=min(n_lists, len(sample_vectors)), replace=False)]
+        # Spherical k-means on a sample; the full corpus is only streamed for assignment
+        for _ in range(iterations):
+            assignment = np.argmax(sample_vectors @ centroids.T, axis=1)
+            for list_id in range(len(centroids)):
+                members = sample_vectors[assignment == list_id]
+                if len(members):
+                    centroids[list_id] = members.mean(axis=0)
+            centroids = normalize_rows(centroids)
+        assignment = np.empty(count, dtype=np.int32)
+        for start in range(0, count, block_size):
+            block = np.asarray(self.vectors[start:start + block_size], dtype=np.float32)
+            assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable').astype(np.int64)
+        offsets = np.searchsorted(assignment[order], np.arange(len(centroids) + 1)).astype(np.int64)
+        np.save(os.path.join(self.directory, 'ivf_centroids.npy'), centroids)
+        np.save(os.path.join(self.directory, 'ivf_order.npy'), order)
+        np.save(os.path.join(self.directory, 'ivf_offsets.npy'), offsets)
+        self.ivf_centroids, self.ivf_order, self.ivf_offsets = centroids, order, offsets
+
+    def search(self, query_vectors, k=5, nprobe=None, block_size=65536):
+        queries = normalize_rows(query_vectors)
+        if not len(self):
+            return [[] for _ in queries]
+        if nprobe and self.ivf_centroids is not None:
+            return [self._search_ivf(query, k, nprobe) for query in queries]
+
+        # Exact search: stream the memory-mapped matrix in blocks, keeping a running top-k per query
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self), block_size):
+            block = np.asarray(self.vectors[start:start + block_size], dtype=np.float32)
+            scores = queries @ block.T
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+        return [self._hits(best_rows[i], best_scores[i]) for i in range(len(queries))]
+
+    def _search_ivf(self, query, k, nprobe):
+        nearest_lists = np.argsort(-(self.ivf_centroids @ query))[:nprobe]
+        candidates = np.concatenate([self.ivf_order[self.ivf_offsets[list_id]:self.ivf_offsets[list_id + 1]]
+                                     for list_id in nearest_lists])
+        if not len(candidates):
+            return []
+        candidates.sort()
+        scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        return self._hits(candidates, scores)
+
+    def _hits(self, rows, scores):
+        order = np.argsort(-scores)
+        return [(int(self.rows[rows[i]][0]), int(self.rows[rows[i]][1]), float(scores[i])) for i in order]
+
+    def save_meta(self):
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as file:
+            json.dump(self.meta, file)
+
+def top_scores(index, embed_fn, queries, nprobe=None, batch_size=64):
+    scores = []
+    for start in range(0, len(queries), batch_size):
+        for hits in index.search(embed_fn(queries[start:start + batch_size]), k=1, nprobe=nprobe):
+            scores.append(hits[0][2] if hits else -1.0)
+    return np.array(scores, dtype=np.float32)
+
+def calibrate_min_score(index, embed_fn, unanswerable, answerable=(), max_false_answers=0.05, nprobe=None):
+    # Mean-pooled BERT cosines are high even between unrelated sentences, so the cutoff comes from
+    # held-out questions the corpus cannot answer: at most max_false_answers of them may clear it.
+    # Answerable questions, if given, report how many would still get a sentence back.
+    misses = np.sort(top_scores(index, embed_fn, list(unanswerable), nprobe))[::-1]
+    if not len(misses):
+        raise ValueError("Calibration needs held-out questions the corpus cannot answer")
+    allowed = int(max_false_answers * len(misses))
+    min_score = float(np.nextafter(misses[allowed], np.float32(np.inf)))
+    hits = top_scores(index, embed_fn, list(answerable), nprobe)
+    index.meta['min_score'] = min_score
+    index.meta['calibration'] = {
+        'unanswerable': len(misses),
+        'answerable': len(hits),
+        'max_false_answers': max_false_answers,
+        'false_answer_rate': float((misses >= min_score).mean()),
+        'answerable_recall': float((hits >= min_score).mean()) if len(hits) else None,
+        'unanswerable_p50': float(np.median(misses)),
+        'nprobe': nprobe,
+    }
+    index.save_meta()
+    return index.meta['calibration']
+
+def build_sentence_index(engine, embed_fn, directory=DEFAULT_INDEX_DIR, batch_size=64, dtype='float16', ivf=True,
+                         embedding_model=None):
+    with engine.connect() as connection:
+        index = SentenceVectorIndex.build(iter_sentence_rows(connection), embed_fn, directory, batch_size, dtype,
+                                          embedding_model=embedding_model)
+    if ivf:
+        index.build_ivf()
+    return index
+
+if __name__ == '__main__':
+    # python -m modules.semantic_search [--calibrate queries.json]
+    # queries.json: {"unanswerable": [...], "answerable": [...]}, questions kept out of the corpus
+    import argparse
+    from modules.nlp import NLPManager
+    from modules.database import get_engine
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calibrate', help="held-out questions; calibrates an existing index instead of building one")
+    parser.add_argument('--max-false-answers', type=float, default=0.05)
+    args = parser.parse_args()
+    nlp_manager = NLPManager()
+    embedder = nlp_manager.embedder
+    if args.calibrate:
+        with open(args.calibrate, 'r') as file:
+            queries = json.load(file)
+        report = calibrate_min_score(SentenceVectorIndex.open(), embedder, queries['unanswerable'],
+                                     queries.get('answerable', ()), args.max_false_answers, nlp_manager.semantic_nprobe)
+        print(f"Minimum score {SentenceVectorIndex.open().meta['min_score']:.4f}: {report}")
+    else:
+        index = build_sentence_index(get_engine('ingestion'), embedder, embedding_model=nlp_manager.model_name)
+        print(f"Indexed {len(index)} sentences into {index.directory}; "
+              f"calibrate it with --calibrate before semantic answers are served")
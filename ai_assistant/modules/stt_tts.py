@@ -1,42 +1,157 @@
 # modules/stt_tts.py
 
-from google.cloud import speech
-from google.cloud import texttospeech
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from modules.audio_cache import AudioCache, AUDIO_EXTENSIONS, audio_key
+from modules.recognition import Transcript, chunk_size_for, iter_audio_chunks
+from modules import metrics
+from modules.metrics import timed
 
-class SpeechManager:
-    def __init__(self):
-        self.speech_client = speech.SpeechClient()
-        self.tts_client = texttospeech.TextToSpeechClient()
-
-    def speech_to_text(self, audio_file):
-        with open(audio_file, 'rb') as audio:
-            content = audio.read()
+AUDIO_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tts_audio')
 
-        audio = speech.RecognitionAudio(content=content)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=16000,
-            language_code='en-US'  # Modify for different languages
-        )
+class GoogleSynthesizer:
+    def __init__(self, client=None):
+        from google.cloud import texttospeech
+        self.client = client or texttospeech.TextToSpeechClient()
 
-        response = self.speech_client.recognize(config=config, audio=audio)
-        for result in response.results:
-            return result.alternatives[0].transcript
-
-    def text_to_speech(self, text, lang='en'):
+    def synthesize(self, text, language_code, voice_name=None, encoding='MP3'):
+        from google.cloud import texttospeech
         synthesis_input = texttospeech.SynthesisInput(text=text)
         voice = texttospeech.VoiceSelectionParams(
-            language_code='en-US' if lang == 'en' else 'hi-IN',
+            language_code=language_code,
+            name=voice_name,
             ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
         )
         audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
+            audio_encoding=getattr(texttospeech.AudioEncoding, encoding)
         )
 
-        response = self.tts_client.synthesize_speech(
+        response = self.client.synthesize_speech(
             input=synthesis_input, voice=voice, audio_config=audio_config
         )
+        return response.audio_content
+
+class GoogleRecognizer:
+    def __init__(self, client=None):
+        from google.cloud import speech
+        self.client = client or speech.SpeechClient()
+
+    def config(self, sample_rate, language_code):
+        from google.cloud import speech
+        return speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=language_code
+        )
+
+    def recognize(self, content, sample_rate=16000, language_code='en-US'):
+        from google.cloud import speech
+        audio = speech.RecognitionAudio(content=content)
+        response = self.client.recognize(config=self.config(sample_rate, language_code), audio=audio)
+        return [result.alternatives[0].transcript for result in response.results if result.alternatives]
+
+    def stream(self, chunks, sample_rate=16000, language_code='en-US', interim_results=True):
+        from google.cloud import speech
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=self.config(sample_rate, language_code),
+            interim_results=interim_results
+        )
+        requests = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in chunks)
+        for response in self.client.streaming_recognize(config=streaming_config, requests=requests):
+            for result in response.results:
+                if result.alternatives:
+                    yield Transcript(result.alternatives[0].transcript, result.is_final, result.stability)
+
+class SpeechManager:
+    def __init__(self, recognizer=None, synthesizer=None, audio_cache=None, output_dir=None):
+        # Clients are created on first use; pass local stand-ins to run without Google Cloud
+        self._recognizer = recognizer
+        self._synthesizer = synthesizer
+        self.audio_cache = audio_cache if audio_cache is not None else AudioCache(directory=AUDIO_CACHE_DIR)
+        self.output_dir = output_dir or tempfile.gettempdir()
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            self._recognizer = GoogleRecognizer()
+        return self._recognizer
+
+    @property
+    def synthesizer(self):
+        if self._synthesizer is None:
+            self._synthesizer = GoogleSynthesizer()
+        return self._synthesizer
+
+    @timed('stt')
+    def speech_to_text(self, audio_file, sample_rate=16000, language_code='en-US'):
+        with open(audio_file, 'rb') as audio:
+            content = audio.read()
+        # Every recognized segment, not just the first one
+        return ' '.join(self.recognizer.recognize(content, sample_rate, language_code))
+
+    def stream_speech_to_text(self, audio, sample_rate=16000, language_code='en-US', chunk_ms=100,
+                              interim_results=True):
+        # audio is a file path, a binary file object or a generator of byte strings (e.g. a microphone);
+        # partial transcripts arrive while audio is still being read, final ones as each segment ends
+        chunks = iter_audio_chunks(audio, chunk_size_for(sample_rate, chunk_ms))
+        started = time.perf_counter()
+        first_result = True
+        for transcript in self.recognizer.stream(chunks, sample_rate, language_code, interim_results):
+            if first_result:
+                metrics.observe(metrics.STAGE_SECONDS, time.perf_counter() - started, stage='stt_first_result')
+                first_result = False
+            metrics.count('assistant_stt_transcripts_total', final=transcript.is_final)
+            yield transcript
+        metrics.observe(metrics.STAGE_SECONDS, time.perf_counter() - started, stage='stt_stream')
+
+    def final_transcripts(self, audio, sample_rate=16000, language_code='en-US', chunk_ms=100):
+        for transcript in self.stream_speech_to_text(audio, sample_rate, language_code, chunk_ms, interim_results=False):
+            if transcript.is_final:
+                yield transcript.text
+
+    @timed('tts')
+    def synthesize(self, text, lang='en', voice=None, encoding='MP3'):
+        language_code = 'en-US' if lang == 'en' else 'hi-IN'
+        # Repeated phrases are served from memory or disk instead of calling the API again
+        key = audio_key(text, language_code, voice, encoding)
+        audio = self.audio_cache.get(key)
+        if audio is not None:
+            metrics.count('assistant_tts_cache_total', result='hit')
+            return audio
+        metrics.count('assistant_tts_cache_total', result='miss')
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+        if not leader:
+            # The same phrase is already being synthesized; wait for that result
+            return future.result()
+        try:
+            with metrics.stage('tts_synthesis'):
+                audio = self.synthesizer.synthesize(text, language_code, voice, encoding)
+            self.audio_cache.set(key, audio, AUDIO_EXTENSIONS.get(encoding, '.audio'))
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(audio)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+        return audio
 
-        with open('output.mp3', 'wb') as out:
-            out.write(response.audio_content)
-        return 'output.mp3'
+    def text_to_speech(self, text, lang='en', voice=None, encoding='MP3', return_bytes=False):
+        audio = self.synthesize(text, lang, voice, encoding)
+        if return_bytes:
+            return audio
+        # Every call gets its own file, so concurrent callers never overwrite each other
+        fd, path = tempfile.mkstemp(prefix='tts_', suffix=AUDIO_EXTENSIONS.get(encoding, '.audio'), dir=self.output_dir)
+        with os.fdopen(fd, 'wb') as out:
+            out.write(audio)
+        return path
@@ -2,19 +2,49 @@
 
 import os.path
 import pickle
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 import base64
+from modules.mail_cache import MessageCache
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly', 'https://www.googleapis.com/auth/gmail.send']
 
+# Gmail accepts up to 100 calls per batch request but starts rate limiting well before that
+BATCH_SIZE = 50
+MAX_CONCURRENT_BATCHES = 4
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.5
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+def error_status(error):
+    return getattr(getattr(error, 'resp', None), 'status', None)
+
+def is_retryable(error):
+    status = error_status(error)
+    # Errors without an HTTP status are connection failures
+    return status is None or int(status) in RETRYABLE_STATUSES or int(status) == 403 and 'rate' in str(error).lower()
+
 class TaskManager:
-    def __init__(self):
-        self.service = self.authenticate_gmail()
+    def __init__(self, service=None, message_cache=None, message_format='full'):
+        # Pass a stand-in service (e.g. benchmarks/stub_services.LocalGmailService) to run without Google credentials
+        self._service = service
+        self.credentials = None
+        self.message_cache = message_cache if message_cache is not None else MessageCache()
+        self.message_format = message_format
+        self.local = threading.local()
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = self.authenticate_gmail()
+        return self._service
 
     def authenticate_gmail(self):
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
         creds = None
         if os.path.exists('token.pickle'):
             with open('token.pickle', 'rb') as token:
@@ -27,26 +57,189 @@ class TaskManager:
                 creds = flow.run_local_server(port=0)
             with open('token.pickle', 'wb') as token:
                 pickle.dump(creds, token)
+        self.credentials = creds
         return build('gmail', 'v1', credentials=creds)
 
+    def http(self):
+        # httplib2 connections are not thread-safe, so each batch thread gets its own
+        if self.credentials is None:
+            return None
+        http = getattr(self.local, 'http', None)
+        if http is None:
+            import httplib2
+            import google_auth_httplib2
+            http = self.local.http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+        return http
+
+    def execute(self, request):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return request.execute(http=self.http())
+            except Exception as error:
+                if attempt == MAX_RETRIES or not is_retryable(error):
+                    raise
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    def iter_messages(self, user_id='me', label_ids=None, query=None, page_size=500):
+        # Follows nextPageToken through the whole listing, one page in memory at a time
+        page_token = None
+        while True:
+            params = {'userId': user_id, 'maxResults': page_size}
+            if label_ids:
+                params['labelIds'] = label_ids
+            if query:
+                params['q'] = query
+            if page_token:
+                params['pageToken'] = page_token
+            response = self.execute(self.service.users().messages().list(**params))
+            yield from response.get('messages', [])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return
+
     def list_messages(self, user_id='me', label_ids=[]):
         try:
-            response = self.service.users().messages().list(userId=user_id, labelIds=label_ids).execute()
-            messages = []
-            if 'messages' in response:
-                messages.extend(response['messages'])
-            return messages
+            return list(self.iter_messages(user_id, label_ids))
         except Exception as error:
             print(f'An error occurred: {error}')
             return None
 
     def get_message(self, user_id, msg_id):
-        try:
-            message = self.service.users().messages().get(userId=user_id, id=msg_id).execute()
+        message = self.message_cache.get(msg_id)
+        if message is not None:
             return message
+        try:
+            message = self.execute(self.service.users().messages().get(userId=user_id, id=msg_id,
+                                                                        format=self.message_format))
         except Exception as error:
             print(f'An error occurred: {error}')
             return None
+        self.message_cache.put_many([message])
+        return message
+
+    def fetch_batch(self, user_id, message_ids, message_format=None):
+        # One batch request for many ids; transient per-message failures are retried in a smaller batch
+        message_format = message_format or self.message_format
+        fetched = {}
+        pending = list(message_ids)
+        for attempt in range(MAX_RETRIES + 1):
+            failed = []
+
+            def collect(request_id, response, error):
+                if error is None:
+                    fetched[request_id] = response
+                elif is_retryable(error):
+                    failed.append((request_id, error))
+                elif error_status(error) != 404:
+                    print(f'An error occurred fetching message {request_id}: {error}')
+
+            batch = self.service.new_batch_http_request(callback=collect)
+            for message_id in pending:
+                batch.add(self.service.users().messages().get(userId=user_id, id=message_id, format=message_format),
+                          request_id=message_id)
+            try:
+                batch.execute(http=self.http())
+            except Exception as error:
+                if not is_retryable(error):
+                    raise
+                failed = [(message_id, error) for message_id in pending if message_id not in fetched]
+            if not failed:
+                break
+            pending = [message_id for message_id, _ in failed]
+            if attempt == MAX_RETRIES:
+                print(f'Giving up on {len(pending)} messages after {MAX_RETRIES} retries: {failed[0][1]}')
+                break
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+        return fetched
+
+    def get_messages(self, message_ids, user_id='me', batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENT_BATCHES,
+                     refresh=False):
+        # Cached messages are returned as is; the rest are fetched in batches, a few batches at a time
+        message_ids = list(dict.fromkeys(message_ids))
+        messages = {} if refresh else self.message_cache.get_many(message_ids)
+        missing = [message_id for message_id in message_ids if message_id not in messages]
+        batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                for fetched in executor.map(lambda batch: self.fetch_batch(user_id, batch), batches):
+                    self.message_cache.put_many(list(fetched.values()))
+                    messages.update(fetched)
+        return [messages[message_id] for message_id in message_ids if message_id in messages]
+
+    def sync(self, user_id='me'):
+        # The first call reads the whole mailbox; later calls replay history since the stored historyId
+        history_id = self.message_cache.history_id
+        if history_id is not None:
+            try:
+                return self.sync_changes(user_id, history_id)
+            except Exception as error:
+                if error_status(error) != 404:
+                    raise
+                # History that old is gone; fall back to a full scan
+        return self.full_sync(user_id)
+
+    def full_sync(self, user_id='me'):
+        # Taken before listing, so changes made during the scan are replayed by the next sync
+        history_id = self.execute(self.service.users().getProfile(userId=user_id))['historyId']
+        message_ids = [message['id'] for message in self.iter_messages(user_id)]
+        stale = set(message['id'] for message in self.message_cache.all()) - set(message_ids)
+        self.message_cache.delete_many(stale)
+        cached = [message_id for message_id in message_ids if message_id in self.message_cache]
+        labels_changed = self.refresh_labels(cached, user_id)
+        missing = [message_id for message_id in message_ids if message_id not in self.message_cache]
+        messages = self.get_messages(missing, user_id)
+        self.message_cache.set_history_id(history_id)
+        return {'full': True, 'added': len(messages), 'deleted': len(stale), 'labels_changed': labels_changed}
+
+    def refresh_labels(self, message_ids, user_id='me', batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENT_BATCHES):
+        # A message's content never changes, only its labels, so cached copies are checked against the
+        # minimal format (ids and labels, no payload) instead of being downloaded again
+        batches = [message_ids[start:start + batch_size] for start in range(0, len(message_ids), batch_size)]
+        changed = 0
+        if batches:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                for fetched in executor.map(lambda batch: self.fetch_batch(user_id, batch, 'minimal'), batches):
+                    cached = self.message_cache.get_many(fetched)
+                    updated = [dict(cached[message_id], labelIds=message.get('labelIds', []))
+                               for message_id, message in fetched.items() if message_id in cached
+                               and cached[message_id].get('labelIds', []) != message.get('labelIds', [])]
+                    self.message_cache.put_many(updated)
+                    changed += len(updated)
+        return changed
+
+    def sync_changes(self, user_id, history_id):
+        added, deleted, label_changes = {}, set(), []
+        page_token = None
+        while True:
+            params = {'userId': user_id, 'startHistoryId': history_id}
+            if page_token:
+                params['pageToken'] = page_token
+            response = self.execute(self.service.users().history().list(**params))
+            for record in response.get('history', []):
+                for change in record.get('messagesAdded', []):
+                    added[change['message']['id']] = True
+                    deleted.discard(change['message']['id'])
+                for change in record.get('messagesDeleted', []):
+                    added.pop(change['message']['id'], None)
+                    deleted.add(change['message']['id'])
+                for change in record.get('labelsAdded', []):
+                    label_changes.append((change['message']['id'], change.get('labelIds', []), ()))
+                for change in record.get('labelsRemoved', []):
+                    label_changes.append((change['message']['id'], (), change.get('labelIds', [])))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+        self.message_cache.delete_many(deleted)
+        # Label changes are applied locally; only new messages are downloaded
+        for message_id, labels_added, labels_removed in label_changes:
+            if message_id not in added:
+                self.message_cache.update_labels(message_id, labels_added, labels_removed)
+        messages = self.get_messages(list(added), user_id)
+        self.message_cache.set_history_id(response['historyId'])
+        return {'full': False, 'added': len(messages), 'deleted': len(deleted), 'labels_changed': len(label_changes)}
+
+    def cached_messages(self, label_ids=None):
+        return self.message_cache.all(label_ids)
 
     def create_message(self, sender, to, subject, message_text):
         message = MIMEText(message_text)
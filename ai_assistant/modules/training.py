@@ -0,0 +1,268 @@
+# modules/training.py
+
+import os
+import copy
+import json
+import queue
+import shutil
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from modules import metrics
+
+class TokenCache:
+    # Token IDs per distinct text, so repeated questions/answers are tokenized only once
+    def __init__(self, tokenizer, max_length=512, max_entries=50000):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def encode(self, text):
+        with self.lock:
+            ids = self.entries.get(text)
+            if ids is not None:
+                self.entries.move_to_end(text)
+                return ids
+        ids = self.tokenizer(text, add_special_tokens=True, max_length=self.max_length, truncation=True)['input_ids']
+        with self.lock:
+            self.entries[text] = ids
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return ids
+
+class InteractionDataset:
+    def __init__(self, interactions, token_cache):
+        self.examples = [(token_cache.encode(item['question']), token_cache.encode(item['answer']))
+                         for item in interactions]
+        # Inputs and labels share one padded length, so an example costs its longer side
+        self.lengths = [max(len(question), len(answer)) for question, answer in self.examples]
+
+    def __len__(self):
+        return len(self.examples)
+
+    def __getitem__(self, index):
+        question, answer = self.examples[index]
+        return {'input_ids': question, 'labels': answer}
+
+class DynamicPaddingCollator:
+    def __init__(self, pad_token_id):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, batch):
+        import torch
+        # Pad only to the longest example in this batch instead of max_length
+        length = max(max(len(item['input_ids']), len(item['labels'])) for item in batch)
+        input_ids = torch.full((len(batch), length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), length), dtype=torch.long)
+        labels = torch.full((len(batch), length), -100, dtype=torch.long)
+        for row, item in enumerate(batch):
+            input_ids[row, :len(item['input_ids'])] = torch.tensor(item['input_ids'])
+            attention_mask[row, :len(item['input_ids'])] = 1
+            labels[row, :len(item['labels'])] = torch.tensor(item['labels'])
+        return {'input_ids': input_ids, 'attention_mask': attention_mask, 'labels': labels}
+
+class LengthBucketBatchSampler:
+    def __init__(self, lengths, batch_size, shuffle=True, bucket_batches=50, seed=None):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_batches = bucket_batches
+        self.random = random.Random(seed)
+
+    def __len__(self):
+        return math.ceil(len(self.lengths) / self.batch_size)
+
+    def __iter__(self):
+        indices = list(range(len(self.lengths)))
+        if self.shuffle:
+            self.random.shuffle(indices)
+        # Sort within buckets of several batches: similar lengths share a batch, order stays random
+        bucket_size = self.batch_size * self.bucket_batches
+        batches = []
+        for start in range(0, len(indices), bucket_size):
+            bucket = sorted(indices[start:start + bucket_size], key=lambda index: self.lengths[index])
+            batches.extend(bucket[i:i + self.batch_size] for i in range(0, len(bucket), self.batch_size))
+        if self.shuffle:
+            self.random.shuffle(batches)
+        return iter(batches)
+
+def make_dataloader(dataset, collator, batch_size=2, shuffle=True):
+    from torch.utils.data import DataLoader
+    sampler = LengthBucketBatchSampler(dataset.lengths, batch_size, shuffle=shuffle)
+    return DataLoader(dataset, batch_sampler=sampler, collate_fn=collator)
+
+def train_on_interactions(model, tokenizer, interactions, output_dir='./results', logging_dir='./logs',
+                          token_cache=None, batch_size=2):
+    from transformers import Trainer, TrainingArguments
+    from sklearn.model_selection import train_test_split
+
+    class BucketedTrainer(Trainer):
+        def get_train_dataloader(self):
+            return make_dataloader(self.train_dataset, self.data_collator, self.args.per_device_train_batch_size)
+
+        def get_eval_dataloader(self, eval_dataset=None):
+            dataset = eval_dataset if eval_dataset is not None else self.eval_dataset
+            return make_dataloader(dataset, self.data_collator, self.args.per_device_eval_batch_size, shuffle=False)
+
+    token_cache = token_cache or TokenCache(tokenizer)
+    interactions = list(interactions)
+    # A lone interaction (the max_wait trigger on a quiet deployment) trains without a validation split
+    if len(interactions) < 2:
+        train_data, val_data = interactions, []
+    else:
+        train_data, val_data = train_test_split(interactions, test_size=0.1)
+
+    training_args = TrainingArguments(
+        output_dir=output_dir,
+        num_train_epochs=1,
+        per_device_train_batch_size=batch_size,
+        per_device_eval_batch_size=batch_size,
+        warmup_steps=10,
+        weight_decay=0.01,
+        logging_dir=logging_dir,
+        logging_steps=10,
+        save_total_limit=1,
+    )
+
+    trainer = BucketedTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=InteractionDataset(train_data, token_cache),
+        eval_dataset=InteractionDataset(val_data, token_cache) if val_data else None,
+        data_collator=DynamicPaddingCollator(tokenizer.pad_token_id),
+    )
+
+    trainer.train()
+    return model
+
+class TrainingWorker:
+    def __init__(self, model_provider, tokenizer_provider, on_model_ready, checkpoint_dir='./checkpoints',
+                 batch_size=6, max_wait=300, max_queue=1000, keep_checkpoints=2, train_fn=train_on_interactions):
+        self.model_provider = model_provider
+        self.tokenizer_provider = tokenizer_provider
+        self.on_model_ready = on_model_ready
+        self.checkpoint_dir = checkpoint_dir
+        # A micro-batch trains once it has batch_size interactions or its oldest one is max_wait seconds old
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.keep_checkpoints = keep_checkpoints
+        self.train_fn = train_fn
+        self.token_cache = None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.runs = 0
+        self.failures = 0
+        self.training = False
+        self.last_duration = None
+        self.total_duration = 0.0
+        self.last_checkpoint = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='training-worker', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def submit(self, question, answer):
+        # Never blocks the request path; when training falls behind, new interactions are dropped
+        try:
+            self.queue.put_nowait({'question': question, 'answer': answer})
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        with self.lock:
+            self.submitted += 1
+        return True
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'runs': self.runs,
+                'failures': self.failures,
+                'training': self.training,
+                'last_duration': self.last_duration,
+                'total_duration': self.total_duration,
+                'last_checkpoint': self.last_checkpoint,
+            }
+
+    def _run(self):
+        batch = []
+        first_at = None
+        while not self.stop_event.is_set():
+            timeout = 0.5 if first_at is None else max(0.0, min(0.5, first_at + self.max_wait - time.monotonic()))
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+                if first_at is None:
+                    first_at = time.monotonic()
+            except queue.Empty:
+                pass
+            if batch and (len(batch) >= self.batch_size or time.monotonic() - first_at >= self.max_wait):
+                self.train_batch(batch)
+                batch, first_at = [], None
+
+    def train_batch(self, batch):
+        started = time.perf_counter()
+        with self.lock:
+            self.training = True
+        try:
+            # Train a copy so the serving model is never mutated mid-request
+            model = copy.deepcopy(self.model_provider())
+            tokenizer = self.tokenizer_provider()
+            if self.token_cache is None or self.token_cache.tokenizer is not tokenizer:
+                self.token_cache = TokenCache(tokenizer)
+            model = self.train_fn(model, tokenizer, batch,
+                                  output_dir=os.path.join(self.checkpoint_dir, 'trainer'),
+                                  logging_dir=os.path.join(self.checkpoint_dir, 'logs'),
+                                  token_cache=self.token_cache)
+            model.eval()
+            checkpoint = self.save_checkpoint(model)
+            self.on_model_ready(model)
+        except Exception as e:
+            print(f"Error in background training: {e}")
+            with self.lock:
+                self.failures += 1
+                self.training = False
+            return
+        duration = time.perf_counter() - started
+        metrics.observe(metrics.STAGE_SECONDS, duration, stage='background_training')
+        with self.lock:
+            self.runs += 1
+            self.training = False
+            self.last_duration = duration
+            self.total_duration += duration
+            self.last_checkpoint = checkpoint
+
+    def save_checkpoint(self, model):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        name = f"checkpoint-{int(time.time() * 1000)}"
+        staging = os.path.join(self.checkpoint_dir, f".{name}.tmp")
+        final = os.path.join(self.checkpoint_dir, name)
+        model.save_pretrained(staging)
+        os.replace(staging, final)
+        # The "latest" pointer is replaced atomically, so readers never see a partial checkpoint
+        pointer = os.path.join(self.checkpoint_dir, 'latest.json')
+        with open(pointer + '.tmp', 'w') as file:
+            json.dump({'checkpoint': name}, file)
+        os.replace(pointer + '.tmp', pointer)
+        checkpoints = sorted(entry for entry in os.listdir(self.checkpoint_dir) if entry.startswith('checkpoint-'))
+        for old in checkpoints[:-self.keep_checkpoints]:
+            shutil.rmtree(os.path.join(self.checkpoint_dir, old), ignore_errors=True)
+        return final
@@ -0,0 +1,132 @@
+# modules/translation.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class TranslationCache:
+    def __init__(self, max_size=10000, ttl=7 * 24 * 3600, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            # Optional persistent tier, shared by every process that points at the same file
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            self.db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            if self.db is not None:
+                row = self.db.execute("SELECT value, created FROM translations WHERE key = ?",
+                                      (json.dumps(key),)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        created = time.time()
+        with self.lock:
+            self._remember(key, value, created)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO translations (key, value, created) VALUES (?, ?, ?)",
+                                (json.dumps(key), value, created))
+                self.db.commit()
+
+    def _remember(self, key, value, created):
+        self.entries[key] = (value, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM translations")
+                self.db.commit()
+
+# googletrans sends one HTTP request per item of a list, so uncached strings are joined one per
+# line into as few requests as the service's length limit allows and split back afterwards
+BATCH_SEPARATOR = '\n'
+MAX_BATCH_CHARS = 4500
+
+def same_language(src, dest):
+    return src != 'auto' and src.split('-')[0].lower() == dest.split('-')[0].lower()
+
+class CachingTranslator:
+    def __init__(self, translator, cache=None):
+        self.translator = translator
+        self.cache = cache if cache is not None else TranslationCache()
+        self.skipped = 0
+
+    def translate(self, text, dest, src='auto'):
+        return self.translate_batch([text], dest, src)[0]
+
+    def translate_batch(self, texts, dest, src='auto'):
+        if same_language(src, dest):
+            self.skipped += len(texts)
+            return list(texts)
+        results = list(texts)
+        missing = {}
+        for position, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            cached = self.cache.get((text, src, dest))
+            if cached is not None:
+                results[position] = cached
+            else:
+                missing.setdefault(text, []).append(position)
+        if missing:
+            pending = list(missing)
+            for text, translation in zip(pending, self.translate_upstream(pending, dest, src)):
+                self.cache.set((text, src, dest), translation)
+                for position in missing[text]:
+                    results[position] = translation
+        return results
+
+    def translate_upstream(self, texts, dest, src):
+        translations = []
+        for group in self.groups(texts, src):
+            if len(group) > 1:
+                lines = self.translator.translate(BATCH_SEPARATOR.join(group), dest=dest, src=src).text.split(BATCH_SEPARATOR)
+                if len(lines) == len(group):
+                    translations.extend(line.strip() for line in lines)
+                    continue
+                # The service merged or split lines; fall back to one request per string
+            translations.extend(item.text for item in self.translator.translate(group, dest=dest, src=src))
+        return translations
+
+    def groups(self, texts, src):
+        # Language detection runs once per request, so strings of unknown language are never joined;
+        # neither are strings that contain the separator themselves
+        group, size = [], 0
+        for text in texts:
+            if src == 'auto' or BATCH_SEPARATOR in text:
+                yield [text]
+                continue
+            if group and size + len(text) + len(BATCH_SEPARATOR) > MAX_BATCH_CHARS:
+                yield group
+                group, size = [], 0
+            group.append(text)
+            size += len(text) + len(BATCH_SEPARATOR)
+        if group:
+            yield group
@@ -0,0 +1,135 @@
+# tests/test_task_management.py
+
+import pytest
+
+from modules import task_management
+from modules.mail_cache import MessageCache
+from modules.task_management import TaskManager
+from stub_services import LocalGmailService, LocalHttpError
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(task_management, 'RETRY_BACKOFF', 0)
+
+def mailbox(count):
+    service = LocalGmailService()
+    ids = [service.add_message(f"Subject {i}", f"Body {i}") for i in range(count)]
+    return service, ids
+
+def subjects(messages):
+    return sorted(message['payload']['headers'][0]['value'] for message in messages)
+
+def test_iter_messages_follows_pages():
+    service, ids = mailbox(12)
+    manager = TaskManager(service)
+    listed = [message['id'] for message in manager.iter_messages(page_size=5)]
+    assert listed == list(reversed(ids))
+    assert service.http_calls == 3
+
+def test_get_messages_batches_and_caches():
+    service, ids = mailbox(120)
+    manager = TaskManager(service)
+    messages = manager.get_messages(ids, batch_size=50)
+    assert [message['id'] for message in messages] == ids
+    assert service.batch_calls == 3
+    assert service.messages_fetched == 120
+    manager.get_messages(ids[:10])
+    assert service.batch_calls == 3
+
+def test_fetch_batch_retries_transient_failures():
+    service, ids = mailbox(5)
+    service.transient_failures = {ids[1]: 2, ids[3]: 1}
+    fetched = TaskManager(service).fetch_batch('me', ids)
+    assert set(fetched) == set(ids)
+    # The first batch fetches three, then two retries carry only the failed ids
+    assert service.batch_calls == 3
+    assert service.messages_fetched == 5
+
+def test_fetch_batch_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(task_management, 'MAX_RETRIES', 2)
+    service, ids = mailbox(3)
+    service.transient_failures = {ids[0]: 10}
+    fetched = TaskManager(service).fetch_batch('me', ids)
+    assert set(fetched) == set(ids[1:])
+    assert service.batch_calls == 3
+
+def test_fetch_batch_skips_deleted_messages():
+    service, ids = mailbox(3)
+    service.delete_message(ids[2])
+    fetched = TaskManager(service).fetch_batch('me', ids)
+    assert set(fetched) == set(ids[:2])
+    assert service.batch_calls == 1
+
+def test_execute_retries_retryable_errors_only():
+    attempts = []
+
+    class Request:
+        def __init__(self, errors):
+            self.errors = list(errors)
+
+        def execute(self, http=None):
+            attempts.append(1)
+            if self.errors:
+                raise self.errors.pop(0)
+            return 'ok'
+
+    manager = TaskManager(LocalGmailService())
+    assert manager.execute(Request([LocalHttpError(503), LocalHttpError(429)])) == 'ok'
+    assert len(attempts) == 3
+    with pytest.raises(LocalHttpError):
+        manager.execute(Request([LocalHttpError(400)]))
+    assert len(attempts) == 4
+
+def test_sync_replays_history_after_full_sync():
+    service, ids = mailbox(6)
+    manager = TaskManager(service)
+    assert manager.sync() == {'full': True, 'added': 6, 'deleted': 0, 'labels_changed': 0}
+
+    new_id = service.add_message("Subject new")
+    service.delete_message(ids[0])
+    service.modify_labels(ids[1], added=['STARRED'], removed=['INBOX'])
+    fetched = service.messages_fetched
+    assert manager.sync() == {'full': False, 'added': 1, 'deleted': 1, 'labels_changed': 2}
+    # Only the new message is downloaded; labels are updated in the cache
+    assert service.messages_fetched == fetched + 1
+    assert new_id in manager.message_cache and ids[0] not in manager.message_cache
+    assert manager.message_cache.get(ids[1])['labelIds'] == ['STARRED']
+    assert subjects(manager.cached_messages()) == subjects(service.mailbox.values())
+
+def test_sync_falls_back_to_full_sync_when_history_expired():
+    service, ids = mailbox(4)
+    manager = TaskManager(service)
+    manager.sync()
+    service.delete_message(ids[0])
+    service.expire_history()
+    assert manager.sync()['full'] is True
+    assert len(manager.message_cache) == 3
+    assert manager.sync() == {'full': False, 'added': 0, 'deleted': 0, 'labels_changed': 0}
+
+def test_sync_resumes_from_persisted_cache(tmp_path):
+    path = str(tmp_path / 'mail.db')
+    service, ids = mailbox(5)
+    TaskManager(service, MessageCache(path)).sync()
+    service.add_message("Subject later")
+    fetched = service.messages_fetched
+    manager = TaskManager(service, MessageCache(path))
+    assert manager.sync()['full'] is False
+    assert service.messages_fetched == fetched + 1
+    assert len(manager.message_cache) == 6
+
+def test_full_sync_refreshes_cached_labels_without_downloading_them():
+    service, ids = mailbox(6)
+    manager = TaskManager(service)
+    manager.sync()
+    new_id = service.add_message("Subject new")
+    service.delete_message(ids[0])
+    service.modify_labels(ids[1], added=['STARRED'], removed=['INBOX'])
+    service.expire_history()
+    fetched = service.messages_fetched
+    assert manager.sync() == {'full': True, 'added': 1, 'deleted': 1, 'labels_changed': 1}
+    # Only the new message comes in full; the five cached ones are checked in the minimal format
+    assert service.messages_fetched == fetched + 1
+    assert service.labels_fetched == 5
+    assert manager.message_cache.get(ids[1])['labelIds'] == ['STARRED']
+    assert 'payload' in manager.message_cache.get(ids[1])
+    assert new_id in manager.message_cache and ids[0] not in manager.message_cache